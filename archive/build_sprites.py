@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Thumbnail Sprite Atlas Builder
+
+Packs the thumbnails of each grid page (24 photos, the page size used by
+index.html) into one JPEG atlas, so the grid loads one image per page
+instead of one per tile. Atlases are built for the "all" view and for each
+category, in photos.json order, which is the order the grid shows them.
+
+Output (sprites/):
+- <view>-<page>-<hash>.jpg   atlas images, named by content so they can be cached forever
+- sprites.json              {"page_size", "tile", "columns", "views": {view: [page, ...]}}
+  where each page is {"url", "width", "height", "tiles": [[id, x, y], ...]}
+
+The page falls back to individual thumbnails when sprites.json is missing or
+a page does not match (e.g. while a search is active).
+
+Requirements:
+pip install pillow
+
+Usage:
+python build_sprites.py [photos.json] [--thumbnails-dir thumbnails]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    print("Missing dependencies. Install with:")
+    print("pip install pillow")
+    exit(1)
+
+SPRITE_CONFIG = {
+    'output_dir': 'sprites',
+    'page_size': 24,         # Must match photosPerPage in index.html
+    'columns': 4,
+    'tile_size': (400, 533),  # 3:4 like the grid tiles
+    'quality': 80,
+}
+
+def thumbnail_source(photo: Dict, thumbnails_dir: Path) -> Optional[Path]:
+    """Local file for a photo's thumbnail URL (relative path, or release asset name)"""
+    url = photo['thumbnail']
+    if url.startswith(('http://', 'https://')):
+        path = thumbnails_dir / url.rsplit('/', 1)[-1]
+    else:
+        path = Path(url)
+    return path if path.exists() else None
+
+def page_digest(photos: List[Dict], sources: List[Path]) -> str:
+    """Hash of everything an atlas depends on"""
+    digest = hashlib.sha1(json.dumps([SPRITE_CONFIG['tile_size'], SPRITE_CONFIG['columns'],
+                                      SPRITE_CONFIG['quality']]).encode())
+    for photo, source in zip(photos, sources):
+        stat = source.stat()
+        digest.update(f"{photo['id']}:{source}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+def build_page(view: str, page: int, photos: List[Dict], thumbnails_dir: Path,
+               output_dir: Path) -> Optional[Dict]:
+    """Render (or reuse) the atlas for one grid page"""
+    sources = [thumbnail_source(photo, thumbnails_dir) for photo in photos]
+    if any(source is None for source in sources):
+        missing = [photo['title'] for photo, source in zip(photos, sources) if source is None]
+        print(f"⚠️  {view} page {page + 1}: missing thumbnails for {', '.join(missing)}, skipping")
+        return None
+    
+    tile_w, tile_h = SPRITE_CONFIG['tile_size']
+    columns = min(SPRITE_CONFIG['columns'], len(photos))
+    rows = (len(photos) + columns - 1) // columns
+    atlas_name = f"{view}-{page}-{page_digest(photos, sources)}.jpg"
+    atlas_path = output_dir / atlas_name
+    
+    tiles = []
+    for i, photo in enumerate(photos):
+        tiles.append([photo['id'], (i % columns) * tile_w, (i // columns) * tile_h])
+    
+    if not atlas_path.exists():
+        atlas = Image.new('RGB', (columns * tile_w, rows * tile_h), (243, 244, 246))
+        for (photo_id, x, y), source in zip(tiles, sources):
+            with Image.open(source) as img:
+                # Crop like the grid's object-cover
+                tile = ImageOps.fit(img.convert('RGB'), (tile_w, tile_h), Image.Resampling.LANCZOS)
+            atlas.paste(tile, (x, y))
+        atlas.save(atlas_path, 'JPEG', quality=SPRITE_CONFIG['quality'], optimize=True, progressive=True)
+        print(f"🧩 Built {atlas_name} ({len(photos)} tiles)")
+    
+    return {
+        'url': f"./{output_dir.as_posix()}/{atlas_name}",
+        'width': columns * tile_w,
+        'height': rows * tile_h,
+        'tiles': tiles
+    }
+
+def build_sprites(photos: List[Dict], thumbnails_dir: Path = Path('thumbnails')) -> Dict:
+    """Build atlases for every page of every view and write sprites.json"""
+    output_dir = Path(SPRITE_CONFIG['output_dir'])
+    output_dir.mkdir(parents=True, exist_ok=True)
+    page_size = SPRITE_CONFIG['page_size']
+    
+    views = {'all': photos}
+    for photo in photos:
+        views.setdefault(photo['category'], []).append(photo)
+    
+    sprites = {
+        'page_size': page_size,
+        'tile': list(SPRITE_CONFIG['tile_size']),
+        'columns': SPRITE_CONFIG['columns'],
+        'views': {}
+    }
+    for view, view_photos in views.items():
+        pages = []
+        for page, start in enumerate(range(0, len(view_photos), page_size)):
+            pages.append(build_page(view, page, view_photos[start:start + page_size], thumbnails_dir, output_dir))
+        sprites['views'][view] = pages
+    
+    # Remove atlases no page refers to any more
+    used = {Path(page['url']).name for pages in sprites['views'].values() for page in pages if page}
+    for atlas in output_dir.glob('*.jpg'):
+        if atlas.name not in used:
+            atlas.unlink()
+    
+    with open(output_dir / 'sprites.json', 'w') as f:
+        json.dump(sprites, f, separators=(',', ':'))
+    
+    built = sum(1 for pages in sprites['views'].values() for page in pages if page)
+    print(f"💾 Saved {output_dir / 'sprites.json'} ({built} atlases)")
+    return sprites
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack grid thumbnails into per-page sprite atlases")
+    parser.add_argument('photos_file', nargs='?', default='photos.json')
+    parser.add_argument('--thumbnails-dir', default='thumbnails',
+                        help="where to find thumbnails referenced by absolute (release) URLs")
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.photos_file):
+        print(f"❌ {args.photos_file} not found")
+        return
+    
+    with open(args.photos_file, 'r') as f:
+        photos = json.load(f)
+    
+    build_sprites(photos, Path(args.thumbnails_dir))
+
+if __name__ == "__main__":
+    main()
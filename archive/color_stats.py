@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Colour and Tone Statistics
+
+Per-photo dominant colours, brightness and sharpness, computed with NumPy on
+a thumbnail (already downsampled, so a photo is a few hundred thousand pixels
+at most) and stored in photos.json, so the site can filter by colour and by
+light/dark without any image processing in the browser.
+
+Fields added to each photo:
+- palette     up to 5 dominant colours as "#rrggbb", most common first
+- luminance   mean Rec. 709 luma, 0 (black) to 1 (white)
+- sharpness   variance of the luma's Laplacian; higher is sharper
+
+local_photos_indexer.py fills these in while rendering each thumbnail. For
+other indexes, or entries made before, this script fills in what is missing
+from the thumbnails on disk, analysing them in batches.
+
+Requirements:
+pip install pillow numpy
+
+Usage:
+python color_stats.py [photos.json] [--thumbnails-dir thumbnails]
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Dict, List
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:
+    print("Missing dependencies. Install with:")
+    print("pip install pillow numpy")
+    exit(1)
+
+STATS_CONFIG = {
+    'sample_size': 64,    # Palette and luminance are computed on a 64x64 sample
+    'levels': 5,          # Per channel when binning colours (5^3 = 125 bins)
+    'palette_size': 5,
+    'min_share': 0.05,    # Colours covering less of the photo are left out
+    'batch_size': 256,
+}
+
+# Rec. 709 luma weights
+LUMA = np.array([0.2126, 0.7152, 0.0722])
+
+def sample(img) -> np.ndarray:
+    """Fixed-size RGB sample of an image, so samples of many photos stack into one array"""
+    size = STATS_CONFIG['sample_size']
+    return np.asarray(img.convert('RGB').resize((size, size), Image.Resampling.BOX), dtype=np.uint8)
+
+def palettes_and_luminance(samples: np.ndarray):
+    """Dominant colours and mean luminance for a batch of samples shaped (photos, height, width, 3)"""
+    photos = len(samples)
+    pixels = samples.reshape(photos, -1, 3).astype(np.int64)
+    levels = STATS_CONFIG['levels']
+    bins = levels ** 3
+    
+    # Bin every pixel of every photo in one pass: each photo gets its own range of bins
+    quantized = (pixels * levels) // 256
+    index = quantized[..., 0] * levels * levels + quantized[..., 1] * levels + quantized[..., 2]
+    index = (index + np.arange(photos)[:, None] * bins).ravel()
+    counts = np.bincount(index, minlength=photos * bins).reshape(photos, bins)
+    sums = np.stack([np.bincount(index, weights=pixels[..., channel].ravel(), minlength=photos * bins)
+                     for channel in range(3)], axis=-1).reshape(photos, bins, 3)
+    
+    # Largest bins first; a bin's colour is the mean of its pixels
+    top = np.argsort(-counts, axis=1, kind='stable')[:, :STATS_CONFIG['palette_size']]
+    top_counts = np.take_along_axis(counts, top, axis=1)
+    top_colors = np.take_along_axis(sums, top[..., None], axis=1) / np.maximum(top_counts, 1)[..., None]
+    
+    minimum = STATS_CONFIG['min_share'] * pixels.shape[1]
+    palettes = [
+        ['#%02x%02x%02x' % tuple(np.rint(color).astype(int)) for color, count in zip(colors, counts_row)
+         if count >= minimum]
+        for colors, counts_row in zip(top_colors, top_counts)
+    ]
+    luminance = (pixels @ LUMA).mean(axis=1) / 255
+    return palettes, luminance
+
+def sharpness(img) -> float:
+    """Variance of the Laplacian of an image's luma (at its own resolution)"""
+    luma = np.asarray(img.convert('L'), dtype=np.float32)
+    if luma.shape[0] < 3 or luma.shape[1] < 3:
+        return 0.0
+    laplacian = (4 * luma[1:-1, 1:-1] - luma[:-2, 1:-1] - luma[2:, 1:-1]
+                 - luma[1:-1, :-2] - luma[1:-1, 2:])
+    return float(laplacian.var())
+
+def analyze(images: List) -> List[Dict]:
+    """Palette, luminance and sharpness for each image, as photos.json fields"""
+    palettes, luminance = palettes_and_luminance(np.stack([sample(img) for img in images]))
+    return [
+        {'palette': palette, 'luminance': round(float(value), 3), 'sharpness': round(sharpness(img), 1)}
+        for img, palette, value in zip(images, palettes, luminance)
+    ]
+
+def fill_missing(photos: List[Dict], thumbnails_dir: Path) -> int:
+    """Add stats to photos without them, from their thumbnails; returns how many were filled in"""
+    from build_sprites import thumbnail_source
+    
+    missing = [photo for photo in photos if 'palette' not in photo]
+    sources = [(photo, thumbnail_source(photo, thumbnails_dir)) for photo in missing]
+    for photo, source in sources:
+        if source is None:
+            print(f"⚠️  No local thumbnail for {photo['title']}, skipping")
+    sources = [(photo, source) for photo, source in sources if source is not None]
+    
+    for start in range(0, len(sources), STATS_CONFIG['batch_size']):
+        batch = sources[start:start + STATS_CONFIG['batch_size']]
+        images = []
+        for _, source in batch:
+            with Image.open(source) as img:
+                img.load()
+                images.append(img)
+        for (photo, _), stats in zip(batch, analyze(images)):
+            photo.update(stats)
+        print(f"🎨 Analysed {start + len(batch)}/{len(sources)} thumbnails")
+    return len(sources)
+
+def main():
+    parser = argparse.ArgumentParser(description="Add colour and tone statistics to photos.json")
+    parser.add_argument('photos_file', nargs='?', default='photos.json')
+    parser.add_argument('--thumbnails-dir', default='thumbnails',
+                        help="where to find thumbnails referenced by absolute (release) URLs")
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.photos_file):
+        print(f"❌ {args.photos_file} not found")
+        return
+    
+    with open(args.photos_file, 'r') as f:
+        photos = json.load(f)
+    
+    if fill_missing(photos, Path(args.thumbnails_dir)):
+        from index_deltas import publish_index
+        publish_index(photos, args.photos_file)
+    print(f"💾 {args.photos_file}: {sum('palette' in photo for photo in photos)}/{len(photos)} photos have colour stats")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Google Drive Folder Listing
+
+Resolves photo filenames to Google Drive file IDs in bulk, from one listing
+of the portfolio folders instead of one lookup (or one prompt) per photo.
+
+A listing comes from either:
+- the Drive API (files.list on each public folder and its subfolders, with
+  an API key; public folders need no OAuth), or
+- a listing file: a saved files.list response (one page, or a list of pages),
+  a plain list of {"id", "name"} files, or a "filename = file_id" mapping as
+  written by google_drive_file_id_helper.py
+
+Fetched listings can be saved as a listing file, so later runs (and tests)
+resolve the same IDs offline. sample_drive_listing.json is a recorded example.
+
+Usage:
+python drive_listing.py FOLDER_ID_OR_LINK... --api-key KEY [-o drive_listing.json]
+python drive_listing.py --show drive_listing.json
+"""
+
+import argparse
+import json
+import os
+import re
+import urllib.parse
+import urllib.request
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+API_URL = 'https://www.googleapis.com/drive/v3/files'
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+MAPPING_LINE = re.compile(r'^\s*(?P<name>[^#=][^=]*?)\s*=\s*(?P<id>\S+)\s*$')
+
+def folder_id_from_link(folder_link: str) -> str:
+    """Folder ID from a sharing link (or an ID, returned as is)"""
+    if '/folders/' in folder_link:
+        return folder_link.split('/folders/')[1].split('?')[0]
+    if 'id=' in folder_link:
+        return folder_link.split('id=')[1].split('&')[0]
+    return folder_link.rstrip('/').split('/')[-1].split('?')[0]
+
+class DriveListing:
+    """Filename -> file ID index over the files in a set of Drive folders"""
+    
+    def __init__(self):
+        self.files: List[Dict] = []
+        self.by_folder: Dict[tuple, List[str]] = {}  # (folder ID, name) -> file IDs
+        self.by_name: Dict[str, List[str]] = {}      # name -> file IDs, any folder
+    
+    def add(self, file: Dict, folders: Iterable[str] = ()):
+        """Index a files.list entry under its parents and any extra (ancestor) folders"""
+        if file.get('mimeType') == FOLDER_MIME_TYPE:
+            return
+        self.files.append(file)
+        # A file can be listed more than once (from two folders): index each ID once
+        keys = [self.by_name.setdefault(file['name'], [])]
+        keys += [self.by_folder.setdefault((folder_id, file['name']), [])
+                 for folder_id in {*file.get('parents', ()), *folders}]
+        for ids in keys:
+            if file['id'] not in ids:
+                ids.append(file['id'])
+    
+    def resolve(self, filename: str, folder_id: Optional[str] = None) -> Optional[str]:
+        """
+        File ID for a filename, looked up in the folder first and then anywhere.
+        Names that match several files are ambiguous and resolve to None.
+        """
+        if folder_id is not None:
+            ids = self.by_folder.get((folder_id, filename))
+            if ids:
+                return ids[0] if len(ids) == 1 else None
+        ids = self.by_name.get(filename, [])
+        return ids[0] if len(ids) == 1 else None
+    
+    def ambiguous(self) -> List[str]:
+        """Names shared by several files"""
+        return sorted(name for name, ids in self.by_name.items() if len(ids) > 1)
+    
+    def __len__(self):
+        return len(self.files)
+    
+    @classmethod
+    def load(cls, listing_file) -> 'DriveListing':
+        """Listing from a saved files.list response, a list of files or pages, or a mapping file"""
+        listing = cls()
+        with open(listing_file, 'r') as f:
+            text = f.read()
+        
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            # "filename = file_id" lines
+            for line in text.splitlines():
+                match = MAPPING_LINE.match(line)
+                if match and match['id'] != 'YOUR_FILE_ID_HERE':
+                    listing.add({'id': match['id'], 'name': match['name']})
+            return listing
+        
+        pages = data if isinstance(data, list) and data and 'files' in data[0] else [data]
+        for page in pages:
+            files = page['files'] if isinstance(page, dict) else page
+            for file in files:
+                listing.add(file, file.get('folders', ()))
+        return listing
+    
+    def save(self, listing_file):
+        """Write the listing as a files.list-style response, readable by load()"""
+        tmp_path = Path(listing_file).with_name(f".{Path(listing_file).name}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'files': self.files}, f, indent=2)
+        os.replace(tmp_path, listing_file)
+    
+    @classmethod
+    def fetch(cls, folder_ids: Iterable[str], api_key: str, fetch_page=None) -> 'DriveListing':
+        """
+        List the files in each folder and its subfolders through the Drive API.
+        Files are also indexed under the top folder they were found from, so a
+        photo in a subfolder resolves by its category folder.
+        """
+        fetch_page = fetch_page or fetch_api_page
+        listing = cls()
+        for root_id in folder_ids:
+            pending = [root_id]
+            while pending:
+                folder_id = pending.pop()
+                page_token = None
+                while True:
+                    page = fetch_page(folder_id, api_key, page_token)
+                    for file in page.get('files', []):
+                        if file.get('mimeType') == FOLDER_MIME_TYPE:
+                            pending.append(file['id'])
+                        else:
+                            file = {**file, 'folders': [root_id]}
+                            listing.add(file, file['folders'])
+                    page_token = page.get('nextPageToken')
+                    if not page_token:
+                        break
+        return listing
+
+def fetch_api_page(folder_id: str, api_key: str, page_token: Optional[str] = None) -> Dict:
+    """One files.list page of a folder's children"""
+    params = {
+        'q': f"'{folder_id}' in parents and trashed = false",
+        'fields': 'nextPageToken, files(id, name, mimeType, parents)',
+        'pageSize': 1000,
+        'key': api_key,
+    }
+    if page_token:
+        params['pageToken'] = page_token
+    with urllib.request.urlopen(f"{API_URL}?{urllib.parse.urlencode(params)}", timeout=30) as response:
+        return json.load(response)
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or inspect a Google Drive folder listing")
+    parser.add_argument('folders', nargs='*', help="folder IDs or sharing links to list")
+    parser.add_argument('--api-key', default=os.environ.get('GOOGLE_DRIVE_API_KEY'),
+                        help="Drive API key (default: $GOOGLE_DRIVE_API_KEY)")
+    parser.add_argument('-o', '--output', default='drive_listing.json')
+    parser.add_argument('--show', metavar='LISTING', help="summarize a listing file instead")
+    args = parser.parse_args()
+    
+    if args.show:
+        listing = DriveListing.load(args.show)
+        print(f"📂 {args.show}: {len(listing)} files")
+    else:
+        if not args.folders or not args.api_key:
+            parser.error("folders and an API key are required to fetch a listing")
+        listing = DriveListing.fetch([folder_id_from_link(folder) for folder in args.folders], args.api_key)
+        listing.save(args.output)
+        print(f"📂 Listed {len(listing)} files into {args.output}")
+    
+    for name in listing.ambiguous():
+        print(f"⚠️  {name} matches several files and will not resolve by name")
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,24 @@ Generate photos.json with GitHub Releases URLs
 Run this after uploading images to GitHub Releases
 """
 
+import importlib.util
 import json
 import os
+import subprocess
+import sys
 from pathlib import Path
 from datetime import datetime
 
+from search_index import write_search_index
+from index_deltas import content_id, file_sha1, publish_index
+from photo_record import PhotoRecord
+
+# Pillow is imported when a thumbnail is rendered, not at startup
+if importlib.util.find_spec('PIL') is None:
+    print("Missing dependencies. Install with:")
+    print("pip install pillow")
+    exit(1)
+
 # Configuration - Update these with your GitHub details
 GITHUB_CONFIG = {
     'username': 'jodiejacobs',           # Your GitHub username
@@ -16,11 +29,113 @@ GITHUB_CONFIG = {
     'release_tag': 'v1.0.0'             # The release tag you created
 }
 
+# Thumbnail renditions uploaded next to the originals in the release
+THUMBNAIL_CONFIG = {
+    'thumbnails_dir': 'thumbnails',
+    'manifest_file': 'thumbnails/manifest.json',
+    'size': (400, 533),  # Grid tile size (3:4), thumbnails cover it
+    'quality': 82,
+}
+
 def generate_github_url(filename):
     """Generate GitHub Releases download URL"""
     base_url = f"https://github.com/{GITHUB_CONFIG['username']}/{GITHUB_CONFIG['repo']}/releases/download/{GITHUB_CONFIG['release_tag']}"
     return f"{base_url}/{filename}"
 
+def release_asset_name(filename):
+    """GitHub Releases replaces spaces in asset names with dots"""
+    return filename.replace(' ', '.')
+
+def thumbnail_filename(filename):
+    """Name of the thumbnail rendition for an original"""
+    return f"{Path(filename).stem}_thumb.jpg"
+
+def load_thumbnail_manifest():
+    """Load the thumbnail manifest (source stat -> rendition) if present"""
+    manifest_path = Path(THUMBNAIL_CONFIG['manifest_file'])
+    if manifest_path.exists():
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    return {}
+
+def save_thumbnail_manifest(manifest):
+    """Save the thumbnail manifest"""
+    manifest_path = Path(THUMBNAIL_CONFIG['manifest_file'])
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+def generate_thumbnail(image_file, manifest):
+    """
+    Create the thumbnail for an original unless the manifest shows it is current.
+    
+    Returns the thumbnail path and whether it was (re)generated.
+    """
+    stat = image_file.stat()
+    thumb_path = Path(THUMBNAIL_CONFIG['thumbnails_dir']) / thumbnail_filename(image_file.name)
+    entry = manifest.get(image_file.name)
+    
+    if (entry and thumb_path.exists()
+            and entry['source_size'] == stat.st_size
+            and entry['source_mtime'] == int(stat.st_mtime)
+            and entry['size'] == list(THUMBNAIL_CONFIG['size'])
+            and entry['quality'] == THUMBNAIL_CONFIG['quality']):
+        return thumb_path, False
+    
+    from PIL import Image, ImageOps
+    
+    thumb_path.parent.mkdir(parents=True, exist_ok=True)
+    tile_w, tile_h = THUMBNAIL_CONFIG['size']
+    
+    with Image.open(image_file) as img:
+        # Let the JPEG decoder skip most of the pixels of large originals
+        img.draft('RGB', (tile_w * 2, tile_h * 2))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        
+        # Scale so the image covers the 3:4 tile (the grid crops with object-cover)
+        scale = max(tile_w / img.width, tile_h / img.height)
+        if scale < 1:
+            new_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            img = img.resize(new_size, Image.Resampling.LANCZOS)
+        
+        img.save(thumb_path, 'JPEG', quality=THUMBNAIL_CONFIG['quality'],
+                 optimize=True, progressive=True)
+    
+    manifest[image_file.name] = {
+        'source_size': stat.st_size,
+        'source_mtime': int(stat.st_mtime),
+        'size': list(THUMBNAIL_CONFIG['size']),
+        'quality': THUMBNAIL_CONFIG['quality'],
+        'thumbnail': thumb_path.name,
+        'uploaded': False
+    }
+    return thumb_path, True
+
+def upload_thumbnails(manifest):
+    """Upload thumbnails not yet in the release with the GitHub CLI"""
+    pending = [
+        Path(THUMBNAIL_CONFIG['thumbnails_dir']) / entry['thumbnail']
+        for entry in manifest.values()
+        if not entry.get('uploaded')
+    ]
+    
+    if not pending:
+        print("✅ All thumbnails already uploaded")
+        return
+    
+    print(f"⬆️  Uploading {len(pending)} thumbnails to release {GITHUB_CONFIG['release_tag']}...")
+    result = subprocess.run(
+        ['gh', 'release', 'upload', GITHUB_CONFIG['release_tag'], '--clobber'] + [str(p) for p in pending]
+    )
+    if result.returncode != 0:
+        print("❌ Thumbnail upload failed, will retry on next run")
+        return
+    
+    for entry in manifest.values():
+        entry['uploaded'] = True
+
 def extract_category_from_filename(filename):
     """Extract category from filename pattern like 'street_001_dscf2561.jpg'"""
     name_lower = filename.lower()
@@ -63,7 +178,12 @@ def scan_portfolio_directory():
         return []
     
     photos = []
-    photo_id = 1
+    
+    # Keep the date a photo was first listed, so unchanged photos stay unchanged in the index
+    previous_dates = {}
+    if os.path.exists('photos.json'):
+        with open('photos.json', 'r') as f:
+            previous_dates = {photo['filename']: photo['date'] for photo in json.load(f)}
     
     # Supported image extensions
     image_extensions = {'.jpg', '.jpeg', '.png', '.JPG', '.JPEG', '.PNG'}
@@ -76,29 +196,53 @@ def scan_portfolio_directory():
     # Sort files for consistent ordering
     image_files.sort()
     
+    manifest = load_thumbnail_manifest()
+    generated = 0
+    
     for image_file in image_files:
         filename = image_file.name
         info = extract_info_from_filename(filename)
         
-        photo_data = {
-            'id': photo_id,
-            'title': info['title'],
-            'category': info['category'],
-            'thumbnail': generate_github_url(filename),
-            'full': generate_github_url(filename),
-            'lat': None,
-            'lng': None,
-            'location': 'Unknown',
-            'date': datetime.now().strftime('%Y-%m-%d'),
-            'filename': filename,
-            'original_file': filename
-        }
+        try:
+            thumb_path, was_generated = generate_thumbnail(image_file, manifest)
+            thumbnail_url = generate_github_url(release_asset_name(thumb_path.name))
+            generated += was_generated
+        except Exception as e:
+            # Fall back to the original rather than dropping the photo
+            print(f"⚠️  Thumbnail failed for {filename}: {e}")
+            thumbnail_url = generate_github_url(release_asset_name(filename))
+        
+        photo_data = PhotoRecord(
+            id=content_id(file_sha1(image_file)),
+            title=info['title'],
+            category=info['category'],
+            thumbnail=thumbnail_url,
+            full=generate_github_url(release_asset_name(filename)),
+            lat=None,
+            lng=None,
+            location='Unknown',
+            date=previous_dates.get(filename, datetime.now().strftime('%Y-%m-%d')),
+            filename=filename,
+            original_file=filename
+        )
         
         photos.append(photo_data)
-        photo_id += 1
         
         print(f"✅ Added: {filename} → {info['category']}")
     
+    # Forget thumbnails whose originals are gone
+    current = {image_file.name for image_file in image_files}
+    for name in list(manifest):
+        if name not in current:
+            del manifest[name]
+    
+    save_thumbnail_manifest(manifest)
+    print(f"🖼️  Thumbnails: {generated} generated, {len(image_files) - generated} unchanged")
+    
+    if '--upload' in sys.argv:
+        upload_thumbnails(manifest)
+        save_thumbnail_manifest(manifest)
+    
     return photos
 
 def generate_photos_json():
@@ -110,16 +254,19 @@ def generate_photos_json():
         print("❌ No images found in portfolio directory")
         return
     
-    # Write to photos.json
-    with open('photos.json', 'w') as f:
-        json.dump(photos, f, indent=2)
+    # Write to photos.json, versioned with a delta for returning visitors
+    index = [photo.to_dict() for photo in photos]
+    publish_index(index, 'photos.json')
+    
+    # Search index for the site's search box
+    write_search_index(index, 'search_index.json')
     
-    print(f"\n✅ Generated photos.json with {len(photos)} photos")
+    print(f"\n✅ Generated photos.json and search_index.json with {len(photos)} photos")
     print(f"📍 URLs point to: https://github.com/{GITHUB_CONFIG['username']}/{GITHUB_CONFIG['repo']}/releases/download/{GITHUB_CONFIG['release_tag']}/")
     
     # Show sample URLs
     if photos:
-        print(f"\n📝 Sample URL: {photos[0]['thumbnail']}")
+        print(f"\n📝 Sample URL: {index[0]['thumbnail']}")
 
 def main():
     print("🚀 GitHub Releases Photos.json Generator")
@@ -135,8 +282,10 @@ def main():
     
     print("\n🎉 Done! Your photos.json is ready for GitHub Releases")
     print("\nNext steps:")
-    print("1. Commit and push the updated photos.json")
-    print("2. Your website should now load images from GitHub Releases")
+    print("1. Upload new thumbnails (or re-run with --upload):")
+    print(f"   gh release upload {GITHUB_CONFIG['release_tag']} {THUMBNAIL_CONFIG['thumbnails_dir']}/*_thumb.jpg --clobber")
+    print("2. Commit and push the updated photos.json")
+    print("3. Your website should now load images from GitHub Releases")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -9,12 +9,18 @@ Usage:
 1. First run google_drive_indexer.py to generate initial photos.json
 2. Set up public sharing for your folders
 3. Run this script to update with actual file IDs
+
+With a Drive folder listing (drive_listing.py), every placeholder is
+resolved in one pass instead of one prompt per photo.
 """
 
 import json
 import os
 from pathlib import Path
 
+from drive_listing import DriveListing, folder_id_from_link
+from index_deltas import publish_index
+
 def extract_file_id_from_url(url):
     """Extract file ID from various Google Drive URL formats"""
     if '/file/d/' in url:
@@ -122,50 +128,60 @@ def create_batch_update_template():
     print("📝 Created file_id_mapping.txt template")
     print("   Fill in the file IDs and run update_from_mapping() to batch update")
 
-def update_from_mapping():
-    """Update photos.json from a file ID mapping file"""
-    mapping_file = 'file_id_mapping.txt'
-    photos_file = 'photos.json'
-    
-    if not Path(mapping_file).exists():
-        print(f"❌ {mapping_file} not found. Run create_batch_update_template() first.")
+def update_from_listing(listing_file='drive_listing.json', photos_file='photos.json'):
+    """
+    Replace every FILE_ID_FOR_ placeholder in photos.json in one pass, from a Drive
+    folder listing or a filename = file_id mapping file
+    """
+    if not Path(listing_file).exists():
+        print(f"❌ {listing_file} not found. Record one with drive_listing.py.")
         return
     
     if not Path(photos_file).exists():
         print(f"❌ {photos_file} not found.")
         return
     
-    # Parse mapping file
-    file_id_map = {}
-    with open(mapping_file, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#') and '=' in line:
-                filename, file_id = line.split('=', 1)
-                file_id_map[filename.strip()] = file_id.strip()
+    listing = DriveListing.load(listing_file)
     
-    # Load and update photos
     with open(photos_file, 'r') as f:
         photos = json.load(f)
     
     updated_count = 0
+    unresolved = []
     for photo in photos:
-        filename = photo['filename']
-        if filename in file_id_map and file_id_map[filename] != 'YOUR_FILE_ID_HERE':
-            file_id = file_id_map[filename]
-            direct_url = create_direct_image_url(file_id)
-            photo['thumbnail'] = direct_url
-            photo['full'] = direct_url
-            photo['file_id'] = file_id
-            updated_count += 1
+        if 'FILE_ID_FOR_' not in photo['thumbnail']:
+            continue
+        folder_link = photo.get('google_drive_folder')
+        file_id = listing.resolve(photo['filename'], folder_id_from_link(folder_link) if folder_link else None)
+        if file_id is None:
+            unresolved.append(photo['filename'])
+            continue
+        
+        direct_url = create_direct_image_url(file_id)
+        photo['thumbnail'] = direct_url
+        photo['full'] = direct_url
+        photo['file_id'] = file_id
+        updated_count += 1
     
     # Save updated photos
-    with open(photos_file, 'w') as f:
-        json.dump(photos, f, indent=2)
+    if updated_count:
+        publish_index(photos, photos_file)
     
-    print(f"🎉 Updated {updated_count} photos from mapping file")
+    print(f"🎉 Updated {updated_count} photos from {listing_file}")
+    if unresolved:
+        print(f"⚠️  {len(unresolved)} placeholders not in the listing (or ambiguous), e.g. {unresolved[0]}")
     print(f"💾 Saved to {photos_file}")
 
+def update_from_mapping():
+    """Update photos.json from a file ID mapping file"""
+    mapping_file = 'file_id_mapping.txt'
+    
+    if not Path(mapping_file).exists():
+        print(f"❌ {mapping_file} not found. Run create_batch_update_template() first.")
+        return
+    
+    update_from_listing(mapping_file)
+
 def main():
     print("🔗 Google Drive File ID Helper")
     print("=" * 30)
@@ -173,8 +189,9 @@ def main():
     print("1. Interactive update (one by one)")
     print("2. Create batch update template")
     print("3. Update from mapping file")
+    print("4. Update from a Drive folder listing (drive_listing.json)")
     
-    choice = input("\nEnter choice (1-3): ").strip()
+    choice = input("\nEnter choice (1-4): ").strip()
     
     if choice == '1':
         update_photos_with_file_ids()
@@ -182,6 +199,8 @@ def main():
         create_batch_update_template()
     elif choice == '3':
         update_from_mapping()
+    elif choice == '4':
+        update_from_listing()
     else:
         print("Invalid choice")
 
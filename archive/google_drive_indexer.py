@@ -12,28 +12,33 @@ Setup:
 1. Create public folders in Google Drive for each category
 2. Get the sharing links for each folder
 3. Update the CONFIG below with your folder IDs
-4. Run the script
+4. Set GOOGLE_DRIVE_API_KEY (or CONFIG['drive_api_key']) so file IDs are
+   resolved from the folder listing, or provide a saved listing file
+   (see drive_listing.py)
+5. Run the script
 
 Usage:
 python google_drive_indexer.py
 """
 
-import json
+import importlib.util
 import os
 import re
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
-try:
-    from PIL import Image
-    from PIL.ExifTags import TAGS, GPSTAGS
-    import exifread
-except ImportError:
+# Pillow and exifread are imported when a photo is first read, not at startup
+if not all(importlib.util.find_spec(name) for name in ('PIL', 'exifread')):
     print("Missing dependencies. Install with:")
     print("pip install pillow exifread")
     exit(1)
 
+from photo_metadata_store import PhotoMetadataStore
+from photo_record import PhotoRecord
+from index_deltas import content_id, publish_index
+from drive_listing import DriveListing, folder_id_from_link
+
 # Configuration - Update these for your setup
 CONFIG = {
     # Local Google Drive path (for scanning metadata)
@@ -56,93 +61,75 @@ CONFIG = {
     
     # Output settings
     'output_file': 'photos.json',
+    'metadata_store': 'photo_metadata.sqlite',  # Shared EXIF/dimension/hash cache
     'max_photos_per_category': 500,
     'supported_formats': ['.jpg', '.jpeg', '.png', '.webp'],
+    
+    # File IDs for direct image URLs, resolved in bulk from a listing of the
+    # public folders: fetched with the Drive API key when set (and saved to the
+    # listing file), otherwise read from the listing file if it exists
+    'drive_api_key': os.environ.get('GOOGLE_DRIVE_API_KEY'),
+    'drive_listing_file': 'drive_listing.json',
 }
 
 class GoogleDrivePublicIndexer:
     def __init__(self):
         self.photos = []
+        self.metadata_store = PhotoMetadataStore(CONFIG['metadata_store'])
         self.base_path = Path(CONFIG['google_drive_path'])
+        self.listing: Optional[DriveListing] = None
+        self.unresolved: List[str] = []
     
     def extract_folder_id(self, folder_link: str) -> str:
         """Extract folder ID from Google Drive sharing link"""
-        # Handle different Google Drive URL formats
-        if '/folders/' in folder_link:
-            folder_id = folder_link.split('/folders/')[1].split('?')[0]
-        elif 'id=' in folder_link:
-            folder_id = folder_link.split('id=')[1].split('&')[0]
-        else:
-            folder_id = folder_link.split('/')[-1].split('?')[0]
-        return folder_id
+        return folder_id_from_link(folder_link)
     
-    def get_google_drive_file_url(self, folder_link: str, filename: str) -> Tuple[str, str]:
+    def load_listing(self) -> Optional[DriveListing]:
         """
-        Generate Google Drive direct file URLs for thumbnail and full size
-        
-        Note: This creates the URL format but the actual file ID would need to be
-        obtained through Google Drive API for direct access. For now, we'll use
-        a viewer URL that works for public folders.
+        Listing of the public folders: from the Drive API when a key is configured
+        (saved for offline runs), otherwise from the listing file, if any
         """
-        folder_id = self.extract_folder_id(folder_link)
-        
-        # For public folders, we can construct viewer URLs
-        # These will show the image in Google Drive's viewer
-        base_viewer_url = f"https://drive.google.com/file/d/FILE_ID/view"
+        folder_ids = [self.extract_folder_id(link) for link in CONFIG['public_folder_links'].values()
+                      if link and 'YOUR_' not in link]
+        listing_file = CONFIG['drive_listing_file']
         
-        # Note: To get actual file IDs, you'd need to use Google Drive API
-        # For now, we'll create placeholder URLs that you can update manually
-        thumbnail_url = f"https://drive.google.com/uc?export=view&id=FILE_ID_FOR_{filename.replace(' ', '_')}"
-        full_url = f"https://drive.google.com/uc?export=view&id=FILE_ID_FOR_{filename.replace(' ', '_')}"
+        if CONFIG['drive_api_key'] and folder_ids:
+            try:
+                listing = DriveListing.fetch(folder_ids, CONFIG['drive_api_key'])
+                listing.save(listing_file)
+                print(f"📂 Listed {len(listing)} files in {len(folder_ids)} Drive folders (saved to {listing_file})")
+                return listing
+            except Exception as e:
+                print(f"⚠️  Could not list Drive folders: {e}")
         
-        return thumbnail_url, full_url
-    
-    def extract_gps_from_exif(self, exif_data) -> Optional[Tuple[float, float]]:
-        """Extract GPS coordinates from EXIF data"""
-        try:
-            if 'GPS GPSLatitude' in exif_data and 'GPS GPSLongitude' in exif_data:
-                lat_ref = str(exif_data.get('GPS GPSLatitudeRef', 'N'))
-                lat_vals = exif_data['GPS GPSLatitude'].values
-                
-                lng_ref = str(exif_data.get('GPS GPSLongitudeRef', 'E'))
-                lng_vals = exif_data['GPS GPSLongitude'].values
-                
-                # Convert to decimal degrees
-                lat = float(lat_vals[0]) + float(lat_vals[1])/60 + float(lat_vals[2])/3600
-                lng = float(lng_vals[0]) + float(lng_vals[1])/60 + float(lng_vals[2])/3600
-                
-                if lat_ref == 'S':
-                    lat = -lat
-                if lng_ref == 'W':
-                    lng = -lng
-                    
-                return lat, lng
-        except Exception as e:
-            print(f"GPS extraction error: {e}")
+        if listing_file and Path(listing_file).exists():
+            listing = DriveListing.load(listing_file)
+            print(f"📂 Loaded {len(listing)} Drive files from {listing_file}")
+            return listing
         return None
     
-    def extract_photo_metadata(self, file_path: Path, category: str) -> Optional[Dict]:
+    def get_google_drive_file_url(self, folder_link: str, filename: str) -> Tuple[str, str]:
+        """
+        Direct image URLs for thumbnail and full size. The file ID comes from the
+        folder listing; files it does not resolve get FILE_ID_FOR_<name> placeholders
+        for google_drive_file_id_helper.py.
+        """
+        folder_id = self.extract_folder_id(folder_link)
+        file_id = self.listing.resolve(filename, folder_id) if self.listing else None
+        if file_id is None:
+            self.unresolved.append(filename)
+            file_id = f"FILE_ID_FOR_{Path(filename).stem.replace(' ', '_')}"
+        
+        url = f"https://drive.google.com/uc?export=view&id={file_id}"
+        return url, url
+    
+    def extract_photo_metadata(self, file_path: Path, category: str) -> Optional[PhotoRecord]:
         """Extract metadata from a photo file"""
         try:
-            # Extract EXIF data
-            exif_data = {}
-            date_taken = None
-            gps_coords = None
-            
-            with open(file_path, 'rb') as f:
-                tags = exifread.process_file(f)
-                exif_data = {str(k): str(v) for k, v in tags.items()}
-                
-                # Extract date
-                if 'EXIF DateTimeOriginal' in tags:
-                    date_str = str(tags['EXIF DateTimeOriginal'])
-                    try:
-                        date_taken = datetime.strptime(date_str, '%Y:%m:%d %H:%M:%S').strftime('%Y-%m-%d')
-                    except:
-                        pass
-                
-                # Extract GPS
-                gps_coords = self.extract_gps_from_exif(tags)
+            # Metadata comes from the shared store; the file is only read when it changed
+            metadata = self.metadata_store.get_local(file_path)
+            date_taken = metadata['date']
+            gps_coords = (metadata['lat'], metadata['lng']) if metadata['lat'] is not None else None
             
             # Get the folder sharing link for this category
             folder_link = CONFIG['public_folder_links'].get(category)
@@ -153,7 +140,7 @@ class GoogleDrivePublicIndexer:
             
             # Generate Google Drive URLs
             filename = file_path.stem
-            thumbnail_url, full_url = self.get_google_drive_file_url(folder_link, filename)
+            thumbnail_url, full_url = self.get_google_drive_file_url(folder_link, file_path.name)
             
             # Extract location from GPS or use default
             location = "Unknown"
@@ -165,25 +152,25 @@ class GoogleDrivePublicIndexer:
                 if parent_dir and parent_dir != category.title():
                     location = parent_dir.replace('_', ' ').replace('-', ' ')
             
-            return {
-                'id': len(self.photos) + 1,
-                'title': filename.replace('_', ' ').replace('-', ' ').title(),
-                'category': category,
-                'thumbnail': thumbnail_url,
-                'full': full_url,
-                'lat': gps_coords[0] if gps_coords else None,
-                'lng': gps_coords[1] if gps_coords else None,
-                'location': location,
-                'date': date_taken or datetime.fromtimestamp(file_path.stat().st_mtime).strftime('%Y-%m-%d'),
-                'filename': file_path.name,
-                'google_drive_folder': folder_link
-            }
-            
+            return PhotoRecord(
+                id=content_id(metadata['sha1']),
+                title=filename.replace('_', ' ').replace('-', ' ').title(),
+                category=category,
+                thumbnail=thumbnail_url,
+                full=full_url,
+                lat=gps_coords[0] if gps_coords else None,
+                lng=gps_coords[1] if gps_coords else None,
+                location=location,
+                date=date_taken or datetime.fromtimestamp(file_path.stat().st_mtime).strftime('%Y-%m-%d'),
+                filename=file_path.name,
+                google_drive_folder=folder_link
+            )
+        
         except Exception as e:
             print(f"Error processing {file_path}: {e}")
             return None
     
-    def scan_directory(self, directory: str, category: str) -> List[Dict]:
+    def scan_directory(self, directory: str, category: str) -> List[PhotoRecord]:
         """Scan a directory for photos"""
         photos = []
         dir_path = self.base_path / directory
@@ -219,7 +206,7 @@ class GoogleDrivePublicIndexer:
             
             if metadata:
                 photos.append(metadata)
-                
+        
         return photos
     
     def generate_index(self):
@@ -245,19 +232,18 @@ class GoogleDrivePublicIndexer:
             print("5. Copy the sharing link and update CONFIG['public_folder_links']")
             print("")
         
+        # One listing resolves every photo's file ID
+        self.listing = self.load_listing()
+        
         for category, directory in CONFIG['photo_directories'].items():
             category_photos = self.scan_directory(directory, category)
             self.photos.extend(category_photos)
             print(f"✅ Added {len(category_photos)} {category} photos")
         
-        # Sort photos by date (newest first)
-        self.photos.sort(key=lambda x: x['date'], reverse=True)
-        
         print(f"📊 Total photos indexed: {len(self.photos)}")
         
-        # Save to JSON
-        with open(CONFIG['output_file'], 'w') as f:
-            json.dump(self.photos, f, indent=2)
+        # Save to JSON (sorted by date, newest first), versioned with a delta for returning visitors
+        publish_index([photo.to_dict() for photo in self.photos], CONFIG['output_file'])
         
         print(f"💾 Saved index to {CONFIG['output_file']}")
         
@@ -265,14 +251,23 @@ class GoogleDrivePublicIndexer:
         categories = {}
         locations = set()
         for photo in self.photos:
-            categories[photo['category']] = categories.get(photo['category'], 0) + 1
-            if photo['location'] != 'Unknown':
-                locations.add(photo['location'])
+            categories[photo.category] = categories.get(photo.category, 0) + 1
+            if photo.location != 'Unknown':
+                locations.add(photo.location)
         
         print("\n📈 Summary:")
         for cat, count in categories.items():
             print(f"   {cat}: {count} photos")
         print(f"   Locations with GPS: {len(locations)}")
+        if self.listing is not None:
+            print(f"   File IDs resolved: {len(self.photos) - len(self.unresolved)}/{len(self.photos)}")
+        
+        if self.unresolved:
+            print(f"\n⚠️  {len(self.unresolved)} photos have placeholder file IDs, e.g. {self.unresolved[0]}")
+            if self.listing is None:
+                print("   Set GOOGLE_DRIVE_API_KEY or save a listing (drive_listing.py) to resolve them in bulk")
+            else:
+                print("   They are missing from the Drive listing, or their names match several files")
         
         if missing_links:
             print(f"\n⚠️  Remember to:")
@@ -306,15 +301,17 @@ Update the CONFIG['public_folder_links'] in the script with your actual links:
 }
 ```
 
-## Step 3: Get Individual File IDs (Optional for Direct Access)
-For direct image access, you'll need individual file IDs:
-1. Upload photos to your public folders
-2. Right-click each photo > "Get link"
-3. Extract the file ID from the link
-4. Update the photos.json file with actual file IDs
+## Step 3: Resolve File IDs (for Direct Access)
+Direct image URLs need each photo's file ID. They are resolved in bulk from a
+listing of your public folders:
+1. Create an API key in the Google Cloud console with the Drive API enabled
+2. Set GOOGLE_DRIVE_API_KEY (or CONFIG['drive_api_key']) and run the indexer:
+   it lists the folders once and saves the listing to drive_listing.json
+3. Without a key, the indexer reuses a saved drive_listing.json
+   (record one with: python drive_listing.py FOLDER_LINK... --api-key KEY)
 
-## Alternative: Use Google Drive API
-For automatic file ID extraction, consider using the Google Drive API.
+Photos missing from the listing keep FILE_ID_FOR_ placeholders; fill those in
+with google_drive_file_id_helper.py.
 """
     
     with open('google_drive_setup.md', 'w') as f:
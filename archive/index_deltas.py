@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Versioned photos.json with Delta Updates
+
+Photo IDs are derived from the source file's content, so an unchanged photo
+keeps its ID (and its cache entries) across rebuilds. Every time photos.json
+changes it gets a new version number, and the difference from the previous
+version is published as a small delta file. Returning visitors who cached
+version N fetch only the deltas from N to the current version.
+
+Output (next to photos.json):
+- photos_version.json   {"version", "count", "sha1", "deltas": [{"from", "to", "url"}, ...]}
+- deltas/photos-<from>-<to>.json
+                        {"from", "to", "added": [photo, ...], "changed": [photo, ...], "removed": [id, ...]}
+- photos_geo.json       [{"id", "title", "location", "lat", "lng"}, ...] for geotagged photos,
+                        all the map needs, fetched only when the map scrolls into view
+
+Only the last few deltas are kept; older visitors reload photos.json in full.
+
+Usage:
+python index_deltas.py [photos.json] [--previous old_photos.json]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DELTA_CONFIG = {
+    'deltas_dir': 'deltas',  # Relative to photos.json
+    'history': 10,           # Deltas kept for returning visitors
+}
+
+def content_id(sha1: str) -> int:
+    """Photo ID from a SHA-1 hex digest: its first 52 bits, exact as a JavaScript number"""
+    return int(sha1[:13], 16)
+
+def file_sha1(file_path: Path) -> str:
+    """SHA-1 hex digest of a file"""
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+def sort_photos(photos: List[Dict]):
+    """Sort in place into index order: newest first, equal dates by ID"""
+    photos.sort(key=lambda x: x['id'])
+    photos.sort(key=lambda x: x['date'] or '', reverse=True)
+
+def index_digest(photos: List[Dict]) -> str:
+    """Hash of an index's content, independent of order and formatting"""
+    canonical = sorted(photos, key=lambda x: x['id'])
+    return hashlib.sha1(json.dumps(canonical, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+def diff_photos(old: List[Dict], new: List[Dict]) -> Dict:
+    """Entries added, changed and removed (by ID) between two indexes"""
+    old_by_id = {photo['id']: photo for photo in old}
+    new_by_id = {photo['id']: photo for photo in new}
+    return {
+        'added': [photo for photo in new if photo['id'] not in old_by_id],
+        'changed': [photo for photo in new if photo['id'] in old_by_id and old_by_id[photo['id']] != photo],
+        'removed': sorted(photo_id for photo_id in old_by_id if photo_id not in new_by_id)
+    }
+
+def write_json(path: Path, data, **kwargs):
+    """Write JSON next to the target and rename it into place"""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, **kwargs)
+    os.replace(tmp_path, path)
+
+def version_file_for(output_file) -> Path:
+    """photos.json -> photos_version.json"""
+    output_path = Path(output_file)
+    return output_path.with_name(f"{output_path.stem}_version.json")
+
+def geo_file_for(output_file) -> Path:
+    """photos.json -> photos_geo.json"""
+    output_path = Path(output_file)
+    return output_path.with_name(f"{output_path.stem}_geo.json")
+
+def geo_subset(photos: List[Dict]) -> List[Dict]:
+    """The map's markers: geotagged photos with only the fields a popup shows"""
+    return [
+        {'id': photo['id'], 'title': photo['title'], 'location': photo['location'],
+         'lat': photo['lat'], 'lng': photo['lng']}
+        for photo in photos
+        if photo.get('lat') is not None and photo.get('lng') is not None
+    ]
+
+def publish_index(photos: List[Dict], output_file='photos.json',
+                  previous: Optional[List[Dict]] = None) -> Dict:
+    """
+    Sort and write photos.json and its map subset, bumping its version and writing
+    a delta when it changed.
+    
+    `previous` is the index being replaced; by default it is read from output_file.
+    A delta is only written when `previous` is the currently published version,
+    otherwise the delta chain restarts and cached clients reload in full.
+    """
+    output_path = Path(output_file)
+    version_path = version_file_for(output_path)
+    deltas_path = output_path.parent / DELTA_CONFIG['deltas_dir']
+    
+    if previous is None and output_path.exists():
+        with open(output_path, 'r') as f:
+            previous = json.load(f)
+    
+    info = {'version': 0, 'count': 0, 'sha1': None, 'deltas': []}
+    if version_path.exists():
+        with open(version_path, 'r') as f:
+            info = json.load(f)
+    
+    sort_photos(photos)
+    write_json(geo_file_for(output_path), geo_subset(photos), separators=(',', ':'))
+    digest = index_digest(photos)
+    if digest == info['sha1']:
+        write_json(output_path, photos, indent=2)
+        return info
+    
+    version = info['version'] + 1
+    deltas = info['deltas']
+    if previous is not None and info['sha1'] == index_digest(previous):
+        delta = {'from': info['version'], 'to': version, **diff_photos(previous, photos)}
+        delta_name = f"{output_path.stem}-{info['version']}-{version}.json"
+        deltas_path.mkdir(parents=True, exist_ok=True)
+        write_json(deltas_path / delta_name, delta, separators=(',', ':'))
+        deltas = deltas + [{'from': info['version'], 'to': version,
+                            'url': f"./{DELTA_CONFIG['deltas_dir']}/{delta_name}"}]
+        print(f"🧮 Version {version}: +{len(delta['added'])} ~{len(delta['changed'])} "
+              f"-{len(delta['removed'])} photos")
+    else:
+        # Unknown base (first run, or photos.json edited by hand): no delta to offer
+        deltas = []
+        print(f"🧮 Version {version}: full index only")
+    
+    deltas = deltas[-DELTA_CONFIG['history']:]
+    if deltas_path.exists():
+        kept = {Path(delta['url']).name for delta in deltas}
+        for delta_file in deltas_path.glob(f"{output_path.stem}-*.json"):
+            if delta_file.name not in kept:
+                delta_file.unlink()
+    
+    # The version file goes last so it never points at a delta that is not there yet
+    write_json(output_path, photos, indent=2)
+    info = {'version': version, 'count': len(photos), 'sha1': digest, 'deltas': deltas}
+    write_json(version_path, info, indent=2)
+    return info
+
+def main():
+    parser = argparse.ArgumentParser(description="Version photos.json and publish a delta from the previous version")
+    parser.add_argument('photos_file', nargs='?', default='photos.json')
+    parser.add_argument('--previous', help="copy of photos.json before it was regenerated")
+    args = parser.parse_args()
+    
+    with open(args.photos_file, 'r') as f:
+        photos = json.load(f)
+    
+    previous = None
+    if args.previous and os.path.getsize(args.previous) > 0:
+        with open(args.previous, 'r') as f:
+            previous = json.load(f)
+    
+    info = publish_index(photos, args.photos_file, previous)
+    print(f"📦 {args.photos_file}: version {info['version']}, {len(info['deltas'])} deltas available")
+
+if __name__ == "__main__":
+    main()
@@ -13,23 +13,107 @@ Directory structure expected:
 
 Requirements:
 pip install pillow exifread
+pip install watchdog  # only for --watch
+pip install rawpy pillow-heif  # only for RAW/HEIC without a large embedded preview
+pip install numpy  # only for --adaptive-quality, colour statistics and related photos
+
+Usage:
+python local_photos_indexer.py          # full rebuild
+python local_photos_indexer.py --watch  # keep photos.json live while importing
+python local_photos_indexer.py --plan   # what changed since the last run (dry run, no imaging libraries)
+python local_photos_indexer.py --resume        # continue a full run that was interrupted
+python local_photos_indexer.py --retry-failed  # same, and reprocess the photos that failed
+python local_photos_indexer.py --adaptive-quality  # lowest JPEG quality meeting target_ssim
+python local_photos_indexer.py --deep-zoom  # also write full-resolution DZI tile pyramids
+
+Distributed rebuild (same source tree on every host, outputs copied together):
+python local_photos_indexer.py --shard 1/3   # on host 1, likewise 2/3 and 3/3
+python local_photos_indexer.py --merge       # once all photos/manifest.shard-*.json are in place
+
+Renditions are content-addressed: photos/{thumbnails,full,zoom}/ab/ab12....jpg,
+named by a hash of the source's content and the settings that rendition is
+rendered with, in subdirectories by the first two hex digits. An unchanged
+photo keeps its URLs across rebuilds, a changed one gets new URLs, so the
+files can be cached indefinitely.
 """
 
+import argparse
+import hashlib
+import io
 import json
+import mmap
 import os
+import queue
 import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from photo_metadata_store import PhotoMetadataStore
+from photo_record import PhotoRecord, to_json
+from index_deltas import content_id, publish_index
+from search_index import write_search_index
+
+# Pillow and the optional decoders are imported by load_imaging() the first
+# time pixels are needed, so --plan and --help start instantly
+Image = None
+ImageCms = None
+rawpy = None
+register_heif_opener = None
+np = None
+color_stats = None
+related_photos = None
 
-try:
-    from PIL import Image
-    from PIL.ExifTags import TAGS, GPSTAGS
-    import exifread
-except ImportError:
-    print("Missing dependencies. Install with:")
-    print("pip install pillow exifread")
-    exit(1)
+def load_imaging():
+    """Import Pillow, exifread and the optional decoders on first use"""
+    global Image, ImageCms, rawpy, register_heif_opener, np, color_stats, related_photos
+    if Image is not None:
+        return
+    
+    try:
+        from PIL import Image as pil_image
+        import exifread  # Read by the metadata store
+    except ImportError:
+        print("Missing dependencies. Install with:")
+        print("pip install pillow exifread")
+        exit(1)
+    
+    # Optional decoders: RAW demosaicing and HEIC, only needed when a source
+    # has no embedded preview large enough for the web renditions
+    try:
+        import rawpy
+    except ImportError:
+        rawpy = None
+    
+    try:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+    except ImportError:
+        register_heif_opener = None
+    
+    # Optional: colour management (Pillow built without LittleCMS lacks ImageCms)
+    try:
+        from PIL import ImageCms
+    except ImportError:
+        ImageCms = None
+    
+    # Optional: SSIM scoring for --adaptive-quality, colour statistics and related photos
+    try:
+        import numpy as np
+        import color_stats
+        import related_photos
+    except ImportError:
+        np = None
+        color_stats = None
+        related_photos = None
+    
+    # Set last: other threads treat a loaded Image as "everything is loaded"
+    Image = pil_image
 
 # Configuration
 CONFIG = {
@@ -45,9 +129,20 @@ CONFIG = {
     
     # Output settings
     'output_file': 'photos.json',
+    'metadata_store': 'photo_metadata.sqlite',  # Shared EXIF/dimension/hash cache
     'web_photos_dir': 'photos',  # Directory for web-optimized photos
+    'manifest_file': 'photos/manifest.json',  # Source file -> index entry, used by --watch
+    'journal_file': 'photos/journal.jsonl',  # Photos done or failed so far in a full run, for --resume
+    'search_index_file': 'search_index.json',  # Inverted index for the site search
+    'build_sprites': False,  # Pack each grid page's thumbnails into one atlas (sprites/)
     'max_photos_per_category': 500,
-    'supported_formats': ['.jpg', '.jpeg', '.png', '.webp', '.heic'],
+    'supported_formats': ['.jpg', '.jpeg', '.png', '.webp', '.heic',
+                          '.dng', '.cr2', '.cr3', '.nef', '.arw', '.raf', '.orf', '.rw2'],
+    
+    # Camera RAW formats; these and HEIC use the camera-embedded JPEG preview
+    # when it is large enough, and are only fully decoded when it is not
+    'raw_formats': ['.dng', '.cr2', '.cr3', '.nef', '.arw', '.raf', '.orf', '.rw2'],
+    'use_embedded_previews': True,
     
     # Image optimization settings
     'create_thumbnails': True,
@@ -56,196 +151,922 @@ CONFIG = {
     'full_size_max': (2000, 2000),  # Max dimensions for web
     'full_size_quality': 90,
     
+    # Adaptive encoding: per rendition, search for the lowest quality between
+    # adaptive_min_quality and the quality above whose SSIM against the resized
+    # image still reaches target_ssim (needs numpy)
+    'adaptive_quality': False,
+    'adaptive_min_quality': 50,
+    'target_ssim': 0.985,
+    
+    # Parallel processing: decoded pixels in flight are capped by the memory budget
+    'workers': os.cpu_count() or 4,
+    'memory_budget_mb': 2048,
+    
+    # Full runs stream photos through read -> render -> write stages: source reads
+    # and output writes on I/O threads, decoding and encoding on the workers above.
+    # Each queue between stages holds at most pipeline_queue_size photos, so bytes
+    # read ahead and renditions waiting to be written stay bounded
+    'io_threads': 2,
+    'pipeline_queue_size': 8,
+    
+    # Colour management: sources with an embedded ICC profile are converted to
+    # sRGB; transforms are cached per distinct (profile, mode)
+    'color_manage': True,
+    'color_transform_cache_size': 16,
+    
+    # Deep zoom: a DZI tile pyramid of each photo at full resolution, rendered
+    # from the same decode, so the lightbox can zoom in by fetching only the
+    # tiles in view (photos/zoom/<name>.dzi and <name>_files/<level>/<col>_<row>.jpg)
+    'deep_zoom': False,
+    'deep_zoom_tile_size': 256,
+    'deep_zoom_overlap': 1,
+    'deep_zoom_quality': 85,
+    
+    # Dominant colours, luminance and sharpness per photo in photos.json, computed
+    # from each thumbnail as it is rendered (needs numpy; see color_stats.py)
+    'color_stats': True,
+    
+    # IDs of the most similar photos (colour, date, place) listed with each
+    # photo for the lightbox (needs numpy; see related_photos.py)
+    'related_photos': True,
+    
     # GitHub Pages base URL
-    'base_url': '.'  # Relative URLs for GitHub Pages
+    'base_url': '.',  # Relative URLs for GitHub Pages
+    
+    # Sharding: set from --shard i/N, None for a single-host run
+    'shard': None,
+    
+    # Watch mode: wait for this many quiet seconds before re-indexing a burst of changes
+    'watch_debounce_seconds': 2.0
 }
 
+# Bytes per pixel of decoded Pillow modes
+MODE_BYTES = {'1': 1, 'L': 1, 'P': 1, 'LA': 2, 'I;16': 2, 'RGB': 3, 'YCbCr': 3, 'LAB': 3, 'HSV': 3,
+              'RGBA': 4, 'RGBX': 4, 'CMYK': 4, 'I': 4, 'F': 4}
+
+# Settings that change rendered output: a run can only be resumed with the same values
+RENDER_SETTINGS = ('thumbnail_size', 'thumbnail_quality', 'full_size_max', 'full_size_quality',
+                   'adaptive_quality', 'adaptive_min_quality', 'target_ssim', 'color_manage',
+                   'use_embedded_previews', 'deep_zoom', 'deep_zoom_tile_size', 'deep_zoom_overlap',
+                   'deep_zoom_quality', 'color_stats')
+
+# Settings each kind of rendition is rendered with, hashed into its file name together
+# with the source's content. RENDITION_VERSION is bumped when the rendering code
+# itself changes what it writes.
+RENDITION_VERSION = 1
+RENDITION_SETTINGS = {
+    'full': ('full_size_max', 'full_size_quality'),
+    'thumb': ('thumbnail_size', 'thumbnail_quality'),
+    'zoom': ('deep_zoom_tile_size', 'deep_zoom_overlap', 'deep_zoom_quality'),
+}
+SHARED_RENDITION_SETTINGS = ('adaptive_quality', 'adaptive_min_quality', 'target_ssim',
+                             'color_manage', 'use_embedded_previews')
+
+# EXIF orientation -> Image.Transpose member that undoes it
+EXIF_TRANSPOSE = {
+    2: 'FLIP_LEFT_RIGHT',
+    3: 'ROTATE_180',
+    4: 'FLIP_TOP_BOTTOM',
+    5: 'TRANSPOSE',
+    6: 'ROTATE_270',
+    7: 'TRANSVERSE',
+    8: 'ROTATE_90'
+}
+
+def estimate_decode_bytes(input_path: Path) -> int:
+    """Estimate peak pixel memory for rendering a source, from its header only"""
+    with Image.open(input_path) as img:  # Lazy: pixels are not read here
+        width, height = img.size
+        mode = img.mode
+    
+    pixels = width * height
+    decoded = pixels * MODE_BYTES.get(mode, 4)
+    
+    # Flattening alpha adds a white RGB background plus the alpha band,
+    # other non-RGB modes add one converted RGB copy
+    if mode in ('RGBA', 'LA'):
+        working = pixels * 4
+    elif mode not in ('RGB', 'L'):
+        working = pixels * 3
+    else:
+        working = 0
+    return decoded + working
+
+def jpeg_stream_end(data, start: int) -> Optional[int]:
+    """Offset just past the EOI of the JPEG stream starting at `start`, or None if malformed"""
+    i = start + 2
+    n = len(data)
+    while i + 4 <= n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # Fill byte
+            i += 1
+            continue
+        if marker == 0xD9:  # EOI
+            return i + 2
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:  # Markers without a length
+            i += 2
+            continue
+        
+        length = int.from_bytes(data[i + 2:i + 4], 'big')
+        if marker != 0xDA:
+            i += 2 + length
+            continue
+        
+        # Start of scan: skip entropy-coded data up to the next real marker
+        # (0xFF00 is a stuffed byte, 0xFFD0-D7 are restart markers)
+        j = i + 2 + length
+        while True:
+            j = data.find(b'\xff', j)
+            if j == -1 or j + 1 >= n:
+                return None
+            following = data[j + 1]
+            if following == 0x00 or 0xD0 <= following <= 0xD7:
+                j += 2
+            elif following == 0xFF:
+                j += 1
+            else:
+                break
+        i = j
+    return None
+
+def source_file(input_path: Path, data: Optional[bytes] = None):
+    """What decoders should open: a fresh file object over bytes already read, else the path"""
+    return io.BytesIO(data) if data is not None else str(input_path)
+
+def largest_jpeg_stream(data) -> Optional[bytes]:
+    """Largest well-formed JPEG stream in a buffer"""
+    best = None
+    pos = data.find(b'\xff\xd8\xff')
+    while pos != -1:
+        end = jpeg_stream_end(data, pos)
+        if end is not None and (best is None or end - pos > best[1] - best[0]):
+            best = (pos, end)
+        pos = data.find(b'\xff\xd8\xff', end if end is not None else pos + 2)
+    return data[best[0]:best[1]] if best else None
+
+def extract_embedded_preview(input_path: Path, data: Optional[bytes] = None) -> Optional[bytes]:
+    """Largest camera-embedded JPEG preview in a RAW or HEIC container, if any"""
+    # LibRaw knows each maker's layout, including previews a byte scan would miss
+    if rawpy is not None and input_path.suffix.lower() in CONFIG['raw_formats']:
+        try:
+            with rawpy.imread(source_file(input_path, data)) as raw:
+                thumb = raw.extract_thumb()
+            if thumb.format == rawpy.ThumbFormat.JPEG:
+                return bytes(thumb.data)
+        except Exception:
+            pass
+    
+    # Otherwise take the largest well-formed JPEG stream in the file
+    if data is not None:
+        return largest_jpeg_stream(data)
+    with open(input_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return largest_jpeg_stream(mapped)
+
+def encode_jpeg(img, quality: int) -> bytes:
+    """Progressive, optimized JPEG without metadata"""
+    buffer = io.BytesIO()
+    img.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+def luminance(img):
+    """Luminance plane as a float array"""
+    return np.asarray(img.convert('L'), dtype=np.float64)
+
+def ssim(reference, candidate) -> float:
+    """Mean SSIM of two luminance planes over 8x8 blocks"""
+    height, width = (reference.shape[0] // 8) * 8, (reference.shape[1] // 8) * 8
+    if height == 0 or width == 0:
+        return 1.0
+    
+    blocks_a = reference[:height, :width].reshape(height // 8, 8, width // 8, 8)
+    blocks_b = candidate[:height, :width].reshape(height // 8, 8, width // 8, 8)
+    mu_a = blocks_a.mean(axis=(1, 3))
+    mu_b = blocks_b.mean(axis=(1, 3))
+    var_a = blocks_a.var(axis=(1, 3))
+    var_b = blocks_b.var(axis=(1, 3))
+    covariance = ((blocks_a - mu_a[:, None, :, None]) * (blocks_b - mu_b[:, None, :, None])).mean(axis=(1, 3))
+    
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    scores = ((2 * mu_a * mu_b + c1) * (2 * covariance + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(scores.mean())
+
+# Rendition size that keeps the full resolution (deep zoom pyramids)
+FULL_RESOLUTION = (1 << 30, 1 << 30)
+
+def encode_dzi(img, dzi_path: Path, quality: int) -> List[Tuple[Path, bytes]]:
+    """Files of a Deep Zoom pyramid for img: its tiles, then the .dzi descriptor"""
+    tile_size, overlap = CONFIG['deep_zoom_tile_size'], CONFIG['deep_zoom_overlap']
+    tiles_dir = dzi_path.with_name(f"{dzi_path.stem}_files")
+    
+    width, height = img.size
+    files = []
+    level_img = img
+    # Level L is the full image, each level below it half the size, down to 1x1 at level 0
+    for level in range((max(width, height) - 1).bit_length(), -1, -1):
+        level_dir = tiles_dir / str(level)
+        level_width, level_height = level_img.size
+        for col in range((level_width + tile_size - 1) // tile_size):
+            for row in range((level_height + tile_size - 1) // tile_size):
+                # Tiles overlap their neighbours so the viewer can blend seams
+                box = (col * tile_size - (overlap if col else 0),
+                       row * tile_size - (overlap if row else 0),
+                       min((col + 1) * tile_size + overlap, level_width),
+                       min((row + 1) * tile_size + overlap, level_height))
+                files.append((level_dir / f"{col}_{row}.jpg", encode_jpeg(level_img.crop(box), quality)))
+        if level:
+            level_img = level_img.reduce(2)  # Rounds up, as the DZI level sizes do
+    
+    # Descriptor last, so a viewer never opens a half-written pyramid
+    files.append((dzi_path, (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="jpg" '
+        f'Overlap="{overlap}" TileSize="{tile_size}"><Size Width="{width}" Height="{height}"/></Image>\n'
+    ).encode()))
+    return files
+
+def remove_dzi(dzi_path: Path):
+    """Delete a Deep Zoom descriptor and its tiles"""
+    tiles_dir = dzi_path.with_name(f"{dzi_path.stem}_files")
+    if tiles_dir.exists():
+        shutil.rmtree(tiles_dir)
+    if dzi_path.exists():
+        dzi_path.unlink()
+
+def fit_within(img, max_size: tuple):
+    """Downscale to fit max_size, keeping aspect ratio (never upscales)"""
+    if img.size[0] <= max_size[0] and img.size[1] <= max_size[1]:
+        return img
+    scale = min(max_size[0] / img.size[0], max_size[1] / img.size[1])
+    new_size = (max(1, round(img.size[0] * scale)), max(1, round(img.size[1] * scale)))
+    return img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+class MemoryBudget:
+    """Counting semaphore over bytes of decoded pixels shared by worker threads"""
+    
+    def __init__(self, total_bytes: int):
+        self.total = total_bytes
+        self.available = total_bytes
+        self.condition = threading.Condition()
+    
+    @contextmanager
+    def reserve(self, nbytes: int):
+        """Block until nbytes fit in the budget; oversized jobs wait for the whole budget"""
+        nbytes = min(nbytes, self.total)
+        with self.condition:
+            self.condition.wait_for(lambda: self.available >= nbytes)
+            self.available -= nbytes
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.available += nbytes
+                self.condition.notify_all()
+
+class Pipeline:
+    """
+    Jobs flow through stages of threads joined by bounded queues. A full queue
+    blocks the stage feeding it (backpressure), so work in flight stays bounded.
+    A stage that raises passes the error along in place of its result.
+    
+    Each stage's busy time and the depth of its input queue are sampled: a stage
+    whose input queue stays full while it is always busy is the bottleneck.
+    """
+    
+    def __init__(self, stages: List[Tuple[str, Callable, int]], queue_size: int,
+                 on_done: Optional[Callable] = None):
+        self.stages = stages  # (name, function, threads)
+        self.queue_size = queue_size
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self.results = queue.Queue()  # Unbounded: the last stage never waits on the consumer
+        self.on_done = on_done        # Called as (job, result, error) when a job leaves the pipeline
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+        self.running = [threads for _, _, threads in stages]
+        self.threads = []
+        self.started = None
+        self.elapsed = 0.0
+        self.stats = {name: {'threads': threads, 'jobs': 0, 'busy': 0.0, 'depth_sum': 0, 'depth_max': 0}
+                      for name, _, threads in stages}
+    
+    def run(self, jobs: List) -> Iterator[Tuple[int, object, Optional[Exception]]]:
+        """Yield (job index, result, error) as jobs complete, in completion order"""
+        self.threads = [threading.Thread(target=self.feed, args=(jobs,), daemon=True)]
+        for stage, (_, _, threads) in enumerate(self.stages):
+            self.threads += [threading.Thread(target=self.work, args=(stage,), daemon=True) for _ in range(threads)]
+        self.started = time.perf_counter()
+        for thread in self.threads:
+            thread.start()
+        
+        while True:
+            item = self.results.get()
+            if item is None:
+                break
+            yield item
+        self.close()
+    
+    def close(self):
+        """Stop taking new jobs, let the ones in progress finish, and wait for every thread"""
+        self.cancelled.set()
+        for thread in self.threads:
+            # Interrupted while starting: every thread must run for end-of-input to propagate
+            if thread.ident is None:
+                thread.start()
+            thread.join()
+        if self.started is not None:
+            self.elapsed = time.perf_counter() - self.started
+            self.started = None
+    
+    def feed(self, jobs: List):
+        for index, job in enumerate(jobs):
+            if self.cancelled.is_set():
+                break
+            self.queues[0].put((index, job, job, None))
+        for _ in range(self.stages[0][2]):
+            self.queues[0].put(None)
+    
+    def work(self, stage: int):
+        name, function, _ = self.stages[stage]
+        stats = self.stats[name]
+        inbox = self.queues[stage]
+        last = stage == len(self.stages) - 1
+        
+        while True:
+            depth = inbox.qsize()
+            item = inbox.get()
+            if item is None:
+                break
+            index, job, value, error = item
+            # Once cancelled, jobs not yet started are dropped; later stages finish theirs
+            if stage == 0 and self.cancelled.is_set():
+                continue
+            
+            started = time.perf_counter()
+            if error is None:
+                try:
+                    value = function(value)
+                except BaseException as e:  # Even SystemExit must not take the thread down
+                    error = e
+            
+            if last:
+                if self.on_done is not None:
+                    try:
+                        self.on_done(job, None if error else value, error)
+                    except Exception as e:
+                        error = error or e
+                self.results.put((index, value, error))
+            busy = time.perf_counter() - started
+            with self.lock:
+                stats['jobs'] += 1
+                stats['busy'] += busy
+                stats['depth_sum'] += depth
+                stats['depth_max'] = max(stats['depth_max'], depth)
+            if not last:
+                self.queues[stage + 1].put((index, job, value, error))
+        
+        # The stage's last thread to finish ends the next stage's input
+        with self.lock:
+            self.running[stage] -= 1
+            finished = self.running[stage] == 0
+        if finished:
+            if last:
+                self.results.put(None)
+            else:
+                for _ in range(self.stages[stage + 1][2]):
+                    self.queues[stage + 1].put(None)
+    
+    def depths(self) -> str:
+        """Current input queue depth of every stage"""
+        return ', '.join(f"{name} {q.qsize()}" for (name, _, _), q in zip(self.stages, self.queues))
+
+def pipeline_report(stats: Dict, elapsed: float, queue_size: int) -> List[str]:
+    """Per-stage utilisation and input queue depth, busiest stage last"""
+    lines = []
+    for name, stage in stats.items():
+        utilisation = 100 * stage['busy'] / (elapsed * stage['threads']) if elapsed else 0
+        average = stage['depth_sum'] / stage['jobs'] if stage['jobs'] else 0
+        lines.append(f"{name:<6} x{stage['threads']:<2} {utilisation:>4.0f}% busy, "
+                     f"input queue {average:.1f} avg / {stage['depth_max']} max of {queue_size}")
+    if elapsed:
+        bottleneck = max(stats, key=lambda name: stats[name]['busy'] / stats[name]['threads'])
+        lines.append(f"bottleneck: {bottleneck}")
+    return lines
+
+class ColorTransformCache:
+    """LRU of ICC -> sRGB transforms keyed by (profile SHA-1, image mode)"""
+    
+    # Modes LittleCMS can convert, and the sRGB mode each one becomes
+    OUTPUT_MODES = {'RGB': 'RGB', 'RGBA': 'RGBA', 'CMYK': 'RGB'}
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.transforms = OrderedDict()
+        self.lock = threading.Lock()
+        self.builds = 0
+        self.hits = 0
+        self.srgb = ImageCms.createProfile('sRGB')
+    
+    def get(self, icc_profile: bytes, mode: str):
+        """Cached transform for a profile, or None when the source is already sRGB or unusable"""
+        key = (hashlib.sha1(icc_profile).hexdigest(), mode)
+        with self.lock:
+            if key in self.transforms:
+                self.transforms.move_to_end(key)
+                self.hits += 1
+                return self.transforms[key]
+            
+            # Built under the lock so concurrent workers never build the same transform twice
+            transform = None
+            try:
+                profile = ImageCms.ImageCmsProfile(io.BytesIO(icc_profile))
+                if not ImageCms.getProfileDescription(profile).strip().startswith('sRGB'):
+                    # NOCACHE: LittleCMS' one-pixel cache is not safe across threads
+                    transform = ImageCms.buildTransform(profile, self.srgb, mode, self.OUTPUT_MODES[mode],
+                                                        renderingIntent=ImageCms.Intent.PERCEPTUAL,
+                                                        flags=ImageCms.Flags.NOCACHE)
+            except (ImageCms.PyCMSError, OSError) as e:
+                print(f"   ⚠️  Unusable ICC profile, treating as sRGB: {e}")
+            
+            self.builds += 1
+            self.transforms[key] = transform
+            if len(self.transforms) > self.maxsize:
+                self.transforms.popitem(last=False)
+            return transform
+    
+    def to_srgb(self, img):
+        """Image converted from its embedded ICC profile to sRGB (unchanged if it has none)"""
+        icc_profile = img.info.get('icc_profile')
+        if not icc_profile or img.mode not in self.OUTPUT_MODES:
+            return img
+        transform = self.get(icc_profile, img.mode)
+        if transform is None:
+            return img
+        return ImageCms.applyTransform(img, transform)
+
+def shard_of(relative_source: str, shard_count: int) -> int:
+    """Deterministic 1-based shard for a source path (same on every host)"""
+    digest = hashlib.sha1(relative_source.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count + 1
+
+def shard_manifest_path(index: int, count: int) -> Path:
+    """Partial manifest written by shard index/count"""
+    manifest_path = Path(CONFIG['manifest_file'])
+    return manifest_path.with_name(f"{manifest_path.stem}.shard-{index}-of-{count}{manifest_path.suffix}")
+
+def journal_path() -> Path:
+    """Journal of the current run (each shard keeps its own)"""
+    path = Path(CONFIG['journal_file'])
+    if CONFIG['shard']:
+        index, count = CONFIG['shard']
+        path = path.with_name(f"{path.stem}.shard-{index}-of-{count}{path.suffix}")
+    return path
+
+def rendition_name(sha1: str, kind: str) -> str:
+    """Content-addressed name of a rendition, without suffix: 'ab/ab12...' (fan-out directory, hash)"""
+    settings = {name: CONFIG[name] for name in (*SHARED_RENDITION_SETTINGS, *RENDITION_SETTINGS[kind])}
+    key = json.dumps([RENDITION_VERSION, kind, sha1, settings], sort_keys=True)
+    digest = hashlib.sha1(key.encode()).hexdigest()[:20]
+    return f"{digest[:2]}/{digest}"
+
+def render_settings() -> Dict:
+    """Current RENDER_SETTINGS as they read back from JSON"""
+    return json.loads(json.dumps({name: CONFIG[name] for name in RENDER_SETTINGS}))
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse an --shard argument of the form i/N"""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {value!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard index must be between 1 and {count}")
+    return index, count
+
+def write_json_atomic(path, data):
+    """Write JSON next to the target and rename it into place"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2, default=to_json)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+class RunJournal:
+    """
+    Append-only JSON lines recording each photo of a full run as it finishes:
+    a header line, then {"source", "size", "mtime", "photo"} for photos done and
+    {"source", "size", "mtime", "error"} for failures. Lines are flushed as they
+    are written, so the journal survives the run being killed.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.file = None
+        self.lock = threading.Lock()
+    
+    def start(self, header: Dict):
+        """Begin a new journal"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, 'w')
+        self.record(header)
+    
+    def resume(self):
+        """Append to the existing journal"""
+        self.file = open(self.path, 'a')
+    
+    def record(self, entry: Dict):
+        with self.lock:
+            self.file.write(json.dumps(entry, default=to_json) + '\n')
+            self.file.flush()
+    
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+    
+    @staticmethod
+    def read(path: Path) -> Tuple[Optional[Dict], Dict, Dict]:
+        """(header, done, failed) by source path; the latest line for a source wins"""
+        header, done, failed = None, {}, {}
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Cut short when the run was killed mid-write
+                if header is None:
+                    header = entry
+                elif 'photo' in entry:
+                    failed.pop(entry['source'], None)
+                    done[entry['source']] = entry
+                else:
+                    done.pop(entry['source'], None)
+                    failed[entry['source']] = entry
+        return header, done, failed
+
 class LocalPhotosIndexer:
     def __init__(self):
+        # Nothing is created or imported here; see prepare_rendering()
         self.photos = []
+        self._metadata_store = None
+        self.metadata_store_lock = threading.Lock()
+        self.manifest = {}  # Relative source path -> {'size', 'mtime', 'photo'}
         self.source_path = Path(CONFIG['photos_source_dir'])
+        self.memory_budget = MemoryBudget(CONFIG['memory_budget_mb'] * 1024 * 1024)
+        self.encode_stats = {'renditions': 0, 'baseline_bytes': 0, 'bytes': 0}
+        self.encode_stats_lock = threading.Lock()
+        self.color_transforms = None
+        self.journal = None        # RunJournal during a full run
+        self.skip = set()          # Sources finished by the run being resumed
+        self.failed = {}           # Source -> error, for this run
+        self.pipeline_stats = {}   # Stage -> totals over this run's pipelines
+        self.pipeline_elapsed = 0.0
         
-        # Create output directories for web-optimized photos
+        # Output directories for web-optimized photos
         self.web_photos_dir = Path(CONFIG['web_photos_dir'])
         self.thumbnails_dir = self.web_photos_dir / 'thumbnails'
         self.full_dir = self.web_photos_dir / 'full'
+        self.zoom_dir = self.web_photos_dir / 'zoom'
+    
+    @property
+    def metadata_store(self) -> PhotoMetadataStore:
+        """Shared metadata cache, opened (and created) on first use"""
+        with self.metadata_store_lock:
+            if self._metadata_store is None:
+                self._metadata_store = PhotoMetadataStore(CONFIG['metadata_store'])
+            return self._metadata_store
+    
+    def prepare_imaging(self):
+        """Load the imaging libraries and the colour transform cache"""
+        load_imaging()
+        if self.color_transforms is None and CONFIG['color_manage'] and ImageCms is not None:
+            self.color_transforms = ColorTransformCache(CONFIG['color_transform_cache_size'])
+    
+    def prepare_rendering(self):
+        """Load the imaging libraries and create the output directories"""
+        self.prepare_imaging()
         
         self.thumbnails_dir.mkdir(parents=True, exist_ok=True)
         self.full_dir.mkdir(parents=True, exist_ok=True)
+        if CONFIG['deep_zoom']:
+            self.zoom_dir.mkdir(parents=True, exist_ok=True)
     
-    def extract_gps_from_exif(self, exif_data) -> Optional[Tuple[float, float]]:
-        """Extract GPS coordinates from EXIF data"""
-        try:
-            if 'GPS GPSLatitude' in exif_data and 'GPS GPSLongitude' in exif_data:
-                lat_ref = str(exif_data.get('GPS GPSLatitudeRef', 'N'))
-                lat_vals = exif_data['GPS GPSLatitude'].values
-                
-                lng_ref = str(exif_data.get('GPS GPSLongitudeRef', 'E'))
-                lng_vals = exif_data['GPS GPSLongitude'].values
-                
-                # Convert to decimal degrees
-                lat = float(lat_vals[0]) + float(lat_vals[1])/60 + float(lat_vals[2])/3600
-                lng = float(lng_vals[0]) + float(lng_vals[1])/60 + float(lng_vals[2])/3600
-                
-                if lat_ref == 'S':
-                    lat = -lat
-                if lng_ref == 'W':
-                    lng = -lng
-                    
-                return lat, lng
-        except Exception as e:
-            print(f"GPS extraction error: {e}")
-        return None
+    def plan_decode(self, input_path: Path, largest: tuple, source: Optional[bytes] = None) -> Tuple[str, object, int]:
+        """
+        Decide how to decode a source for renditions up to `largest`.
+        
+        Returns (kind, data, estimated_bytes) where kind is 'preview' (data is the
+        embedded JPEG), 'raw' (data is whether half-size demosaicing is enough)
+        or 'image' (plain Pillow decode).
+        """
+        suffix = input_path.suffix.lower()
+        
+        if CONFIG['use_embedded_previews'] and suffix in CONFIG['raw_formats'] + ['.heic']:
+            preview = extract_embedded_preview(input_path, source)
+            if preview is not None:
+                with Image.open(io.BytesIO(preview)) as img:
+                    preview_size = img.size
+                # Enough if the preview still has to be downscaled for the largest rendition
+                # (either orientation, the preview may be stored unrotated)
+                if any(min(box[0] / preview_size[0], box[1] / preview_size[1]) <= 1
+                       for box in (largest, largest[::-1])):
+                    return 'preview', preview, estimate_decode_bytes(io.BytesIO(preview))
+        
+        if suffix in CONFIG['raw_formats']:
+            if rawpy is None:
+                raise RuntimeError("no usable embedded preview; install rawpy to decode RAW files")
+            with rawpy.imread(source_file(input_path, source)) as raw:
+                width, height = raw.sizes.width, raw.sizes.height
+                raw_bytes = raw.sizes.raw_width * raw.sizes.raw_height * 2
+            # Half-size demosaicing skips interpolation and quarters the output
+            half_size = min(width, height) // 2 >= max(largest)
+            out_pixels = (width * height) // 4 if half_size else width * height
+            return 'raw', half_size, raw_bytes + out_pixels * 3
+        
+        if suffix == '.heic' and register_heif_opener is None:
+            raise RuntimeError("no usable embedded preview; install pillow-heif to decode HEIC files")
+        
+        return 'image', None, estimate_decode_bytes(source_file(input_path, source))
     
-    def optimize_image(self, input_path: Path, output_path: Path, max_size: tuple, quality: int) -> bool:
-        """Optimize image for web"""
-        try:
-            with Image.open(input_path) as img:
-                # Handle HEIC files
-                if input_path.suffix.lower() == '.heic':
-                    # HEIC files are automatically converted to JPEG
-                    pass
+    @contextmanager
+    def open_source(self, input_path: Path, kind: str, data, largest: tuple, reduced: bool,
+                    source: Optional[bytes] = None):
+        """Yield (image, exif_orientation) for a decode plan from plan_decode"""
+        if kind == 'raw':
+            # LibRaw applies the camera orientation itself
+            with rawpy.imread(source_file(input_path, source)) as raw:
+                rgb = raw.postprocess(use_camera_wb=True, half_size=data, output_bps=8)
+            yield Image.fromarray(rgb), 1
+            return
+        
+        with Image.open(io.BytesIO(data) if kind == 'preview' else source_file(input_path, source)) as img:
+            # Read orientation before any conversion drops the EXIF block;
+            # previews often carry none, the container's EXIF applies then
+            orientation = img.getexif().get(0x0112)
+            if orientation is None:
+                orientation = (self.metadata_store.get_local(input_path)['orientation'] or 1) if kind == 'preview' else 1
+            
+            # Reduced-scale decode: the JPEG decoder skips DCT coefficients
+            # while still returning at least the largest rendition's size
+            if reduced:
+                if orientation in (5, 6, 7, 8):
+                    largest = (largest[1], largest[0])
+                scale = min(1.0, largest[0] / img.size[0], largest[1] / img.size[1])
+                img.draft('RGB', (max(1, int(img.size[0] * scale)), max(1, int(img.size[1] * scale))))
+            
+            yield img, orientation
+    
+    def iter_renditions(self, input_path: Path, sizes: List[tuple],
+                        source: Optional[bytes] = None) -> Iterator[Tuple[int, object]]:
+        """
+        Decode a source once (from `source` when its bytes were already read) and
+        yield (index, image) for each max_size in `sizes`, largest first, oriented
+        and in sRGB, ready to encode.
+        
+        Decoding is scheduled against the shared memory budget; sources whose estimated
+        decode size exceeds the whole budget are decoded at reduced scale when the
+        format supports it (JPEG), otherwise they run alone. RAW and HEIC sources use
+        their embedded JPEG preview when it is large enough for every size.
+        """
+        largest = max(sizes)
+        kind, data, estimate = self.plan_decode(input_path, largest, source)
+        
+        reduced = estimate > self.memory_budget.total
+        if reduced:
+            decodes_jpeg = kind == 'preview' or input_path.suffix.lower() in ('.jpg', '.jpeg')
+            fallback = "reduced-scale decode" if decodes_jpeg else "running alone"
+            print(f"   🐘 {input_path.name}: ~{estimate / (1024*1024):.0f} MB to decode, "
+                  f"over the {CONFIG['memory_budget_mb']} MB budget ({fallback})")
+        
+        with self.memory_budget.reserve(estimate):
+            with self.open_source(input_path, kind, data, largest, reduced, source) as (img, orientation):
+                # Convert from the embedded profile (Adobe RGB, Display P3, ...) to sRGB
+                if self.color_transforms is not None:
+                    img = self.color_transforms.to_srgb(img)
                 
-                # Convert RGBA to RGB if necessary
+                # Flatten transparency onto white, using only the alpha band as mask
                 if img.mode in ('RGBA', 'LA'):
                     background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'RGBA':
-                        background.paste(img, mask=img.split()[-1])
-                    else:
-                        background.paste(img, mask=img.split()[-1])
-                    img = background
+                    background.paste(img, mask=img.getchannel('A'))
+                    work = background
                 elif img.mode not in ('RGB', 'L'):
-                    img = img.convert('RGB')
+                    work = img.convert('RGB')
+                else:
+                    work = img
                 
-                # Auto-rotate based on EXIF orientation
-                try:
-                    exif = img._getexif()
-                    if exif is not None:
-                        orientation = exif.get(274)  # 274 is the orientation tag
-                        if orientation == 3:
-                            img = img.rotate(180, expand=True)
-                        elif orientation == 6:
-                            img = img.rotate(270, expand=True)
-                        elif orientation == 8:
-                            img = img.rotate(90, expand=True)
-                except:
-                    pass
-                
-                # Resize if larger than max_size
-                if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                    img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                
-                # Save optimized image as JPEG
-                output_path = output_path.with_suffix('.jpg')
-                img.save(output_path, 'JPEG', quality=quality, optimize=True)
-                return True
+                # Largest rendition first, each smaller one resized from the previous
+                for index in sorted(range(len(sizes)), key=lambda i: sizes[i], reverse=True):
+                    # Orientation is applied after resizing, so fit the rotated box
+                    max_size = sizes[index]
+                    if orientation in (5, 6, 7, 8):
+                        max_size = (max_size[1], max_size[0])
+                    work = fit_within(work, max_size)
+                    
+                    out = work
+                    if orientation in EXIF_TRANSPOSE:
+                        out = work.transpose(Image.Transpose[EXIF_TRANSPOSE[orientation]])
+                    yield index, out
+    
+    def encode_renditions(self, input_path: Path, renditions: List[Tuple[Path, tuple, int]],
+                          source: Optional[bytes] = None,
+                          photo: Optional[PhotoRecord] = None) -> List[Tuple[Path, bytes]]:
+        """
+        Decode a source once and encode each (output_path, max_size, quality) rendition,
+        returning the files to write; a .dzi output path gets a Deep Zoom tile pyramid.
+        With `photo`, its colour statistics are taken from the smallest rendition.
+        """
+        files = []
+        sizes = [max_size for _, max_size, _ in renditions]
+        for index, img in self.iter_renditions(input_path, sizes, source):
+            output_path, _, quality = renditions[index]
+            if output_path.suffix == '.dzi':
+                files.extend(encode_dzi(img, output_path, quality))
+            else:
+                # Optimized JPEG
+                files.append((output_path.with_suffix('.jpg'), self.encode_rendition(img, quality)))
+        
+        # Renditions come largest first: img is the thumbnail
+        if photo is not None and CONFIG['color_stats'] and color_stats is not None:
+            stats = color_stats.analyze([img])[0]
+            photo.palette, photo.luminance, photo.sharpness = stats['palette'], stats['luminance'], stats['sharpness']
+        return files
+    
+    @staticmethod
+    def write_outputs(files: List[Tuple[Path, bytes]]):
+        """Write encoded renditions in order, replacing any earlier pyramid wholesale"""
+        for path, _ in files:
+            if path.suffix == '.dzi':
+                remove_dzi(path)
+        for directory in {path.parent for path, _ in files}:
+            directory.mkdir(parents=True, exist_ok=True)
+        for path, data in files:
+            path.write_bytes(data)
+    
+    def render_renditions(self, input_path: Path, renditions: List[Tuple[Path, tuple, int]],
+                          photo: Optional[PhotoRecord] = None) -> bool:
+        """Decode a source once and write each (output_path, max_size, quality) rendition"""
+        try:
+            self.write_outputs(self.encode_renditions(input_path, renditions, photo=photo))
+            return True
         except Exception as e:
             print(f"Image optimization error for {input_path}: {e}")
             return False
     
-    def process_photo(self, file_path: Path, category: str) -> Optional[Dict]:
+    def encode_rendition(self, img, quality: int) -> bytes:
+        """
+        Encode a rendition at `quality`, or in adaptive mode at the lowest quality
+        whose SSIM against `img` still meets the target (binary search)
+        """
+        data = encode_jpeg(img, quality)
+        if not CONFIG['adaptive_quality'] or np is None:
+            return data
+        
+        baseline_bytes = len(data)
+        reference = luminance(img)
+        low, high = CONFIG['adaptive_min_quality'], quality
+        while low < high:
+            middle = (low + high) // 2
+            candidate = encode_jpeg(img, middle)
+            with Image.open(io.BytesIO(candidate)) as decoded:
+                score = ssim(reference, luminance(decoded))
+            if score >= CONFIG['target_ssim']:
+                data, high = candidate, middle
+            else:
+                low = middle + 1
+        
+        with self.encode_stats_lock:
+            self.encode_stats['renditions'] += 1
+            self.encode_stats['baseline_bytes'] += baseline_bytes
+            self.encode_stats['bytes'] += len(data)
+        return data
+    
+    def optimize_image(self, input_path: Path, output_path: Path, max_size: tuple, quality: int) -> bool:
+        """Optimize image for web"""
+        return self.render_renditions(input_path, [(output_path, max_size, quality)])
+    
+    def describe_photo(self, file_path: Path, category: str,
+                       photo_id: Optional[int] = None) -> Tuple[PhotoRecord, List[Tuple[Path, tuple, int]]]:
+        """Index entry for a photo and the (output_path, max_size, quality) renditions it needs"""
+        # Metadata comes from the shared store; the file is only read when it changed
+        metadata = self.metadata_store.get_local(file_path)
+        date_taken = metadata['date']
+        gps_coords = (metadata['lat'], metadata['lng']) if metadata['lat'] is not None else None
+        
+        # The ID and the rendition names come from the file's content
+        if photo_id is None:
+            photo_id = content_id(metadata['sha1'])
+        original_name = file_path.stem
+        
+        # Always use .jpg for web versions
+        thumbnail_filename = f"{rendition_name(metadata['sha1'], 'thumb')}.jpg"
+        full_filename = f"{rendition_name(metadata['sha1'], 'full')}.jpg"
+        
+        # Create optimized images
+        thumbnail_path = self.thumbnails_dir / thumbnail_filename
+        full_path = self.full_dir / full_filename
+        
+        # Create web-optimized full size and thumbnail from a single decode
+        renditions = [
+            (full_path, CONFIG['full_size_max'], CONFIG['full_size_quality']),
+            (thumbnail_path, CONFIG['thumbnail_size'], CONFIG['thumbnail_quality'])
+        ]
+        zoom_url = None
+        if CONFIG['deep_zoom']:
+            zoom_filename = f"{rendition_name(metadata['sha1'], 'zoom')}.dzi"
+            renditions.append((self.zoom_dir / zoom_filename, FULL_RESOLUTION, CONFIG['deep_zoom_quality']))
+            zoom_url = f"./photos/zoom/{zoom_filename}"
+        
+        # Generate URLs (relative to website root)
+        thumbnail_url = f"./photos/thumbnails/{thumbnail_filename}"
+        full_url = f"./photos/full/{full_filename}"
+        
+        # Extract location
+        location = "Unknown"
+        if gps_coords:
+            # Simple coordinate display - you could add reverse geocoding here
+            location = f"{gps_coords[0]:.4f}, {gps_coords[1]:.4f}"
+        else:
+            # Try to extract from folder structure
+            parent_dir = file_path.parent.name
+            if parent_dir and parent_dir.lower() != category.lower():
+                location = parent_dir.replace('_', ' ').replace('-', ' ')
+        
+        photo = PhotoRecord(
+            id=photo_id,
+            title=original_name.replace('_', ' ').replace('-', ' ').title(),
+            category=category,
+            thumbnail=thumbnail_url,
+            full=full_url,
+            lat=gps_coords[0] if gps_coords else None,
+            lng=gps_coords[1] if gps_coords else None,
+            location=location,
+            date=date_taken or datetime.fromtimestamp(file_path.stat().st_mtime).strftime('%Y-%m-%d'),
+            filename=full_filename,
+            original_file=file_path.name,
+            zoom=zoom_url
+        )
+        return photo, renditions
+    
+    def process_photo(self, file_path: Path, category: str, photo_id: Optional[int] = None) -> Optional[PhotoRecord]:
         """Process a single photo"""
         try:
-            # Extract EXIF data
-            exif_data = {}
-            date_taken = None
-            gps_coords = None
-            
-            with open(file_path, 'rb') as f:
-                tags = exifread.process_file(f)
-                exif_data = {str(k): str(v) for k, v in tags.items()}
-                
-                # Extract date
-                if 'EXIF DateTimeOriginal' in tags:
-                    date_str = str(tags['EXIF DateTimeOriginal'])
-                    try:
-                        date_taken = datetime.strptime(date_str, '%Y:%m:%d %H:%M:%S').strftime('%Y-%m-%d')
-                    except:
-                        pass
-                elif 'DateTime' in tags:
-                    date_str = str(tags['DateTime'])
-                    try:
-                        date_taken = datetime.strptime(date_str, '%Y:%m:%d %H:%M:%S').strftime('%Y-%m-%d')
-                    except:
-                        pass
-                
-                # Extract GPS
-                gps_coords = self.extract_gps_from_exif(tags)
-            
-            # Generate web-friendly filename
-            photo_id = len(self.photos) + 1
-            original_name = file_path.stem
-            safe_name = "".join(c for c in original_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-            safe_name = safe_name.replace(' ', '_').lower()
-            
-            # Always use .jpg for web versions
-            thumbnail_filename = f"{category}_{photo_id:03d}_{safe_name}_thumb.jpg"
-            full_filename = f"{category}_{photo_id:03d}_{safe_name}.jpg"
-            
-            # Create optimized images
-            thumbnail_path = self.thumbnails_dir / thumbnail_filename
-            full_path = self.full_dir / full_filename
-            
-            # Create thumbnail
-            thumbnail_success = self.optimize_image(
-                file_path, thumbnail_path, 
-                CONFIG['thumbnail_size'], CONFIG['thumbnail_quality']
-            )
-            
-            # Create web-optimized full size
-            full_success = self.optimize_image(
-                file_path, full_path,
-                CONFIG['full_size_max'], CONFIG['full_size_quality']
-            )
-            
-            if not (thumbnail_success and full_success):
+            photo, renditions = self.describe_photo(file_path, category, photo_id)
+            if not self.render_renditions(file_path, renditions, photo):
                 print(f"Failed to process {file_path.name}")
                 return None
-            
-            # Generate URLs (relative to website root)
-            thumbnail_url = f"./photos/thumbnails/{thumbnail_filename}"
-            full_url = f"./photos/full/{full_filename}"
-            
-            # Extract location
-            location = "Unknown"
-            if gps_coords:
-                # Simple coordinate display - you could add reverse geocoding here
-                location = f"{gps_coords[0]:.4f}, {gps_coords[1]:.4f}"
-            else:
-                # Try to extract from folder structure
-                parent_dir = file_path.parent.name
-                if parent_dir and parent_dir.lower() != category.lower():
-                    location = parent_dir.replace('_', ' ').replace('-', ' ')
-            
-            return {
-                'id': photo_id,
-                'title': original_name.replace('_', ' ').replace('-', ' ').title(),
-                'category': category,
-                'thumbnail': thumbnail_url,
-                'full': full_url,
-                'lat': gps_coords[0] if gps_coords else None,
-                'lng': gps_coords[1] if gps_coords else None,
-                'location': location,
-                'date': date_taken or datetime.fromtimestamp(file_path.stat().st_mtime).strftime('%Y-%m-%d'),
-                'filename': full_filename,
-                'original_file': file_path.name
-            }
-            
+            return photo
+        
         except Exception as e:
             print(f"Error processing {file_path}: {e}")
             return None
     
-    def scan_directory(self, directory: str, category: str) -> List[Dict]:
-        """Scan directory and process photos"""
-        photos = []
+    # Pipeline stages of a full run (see scan_directory); each takes the previous stage's output
+    def read_stage(self, job: Tuple[Path, str]):
+        """I/O: metadata (from the store) and the source file's bytes"""
+        file_path, category = job
+        photo, renditions = self.describe_photo(file_path, category)
+        return file_path, photo, renditions, file_path.read_bytes()
+    
+    def render_stage(self, job):
+        """CPU: decode, resize and encode every rendition from the bytes in memory"""
+        file_path, photo, renditions, source = job
+        return file_path, photo, self.encode_renditions(file_path, renditions, source, photo)
+    
+    def write_stage(self, job):
+        """I/O: write the encoded files"""
+        file_path, photo, files = job
+        self.write_outputs(files)
+        return photo
+    
+    def finish_photo(self, job: Tuple[Path, str], photo: Optional[PhotoRecord], error: Optional[Exception]):
+        """Record a photo's outcome in the run journal as soon as it is known"""
+        file_path = job[0]
+        stat = file_path.stat()
+        entry = {'source': self.relative_source(file_path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+        if error is None:
+            entry['photo'] = photo
+        else:
+            print(f"Error processing {file_path}: {error}")
+            entry['error'] = str(error)
+            self.failed[entry['source']] = entry['error']
+        self.journal.record(entry)
+    
+    def discover_files(self, directory: str, category: str, verbose: bool = True) -> List[Path]:
+        """Photo files a full run indexes for a category, newest first"""
         dir_path = self.source_path / directory
         
         if not dir_path.exists():
             print(f"⚠️  Directory not found: {dir_path}")
             print(f"   Please create: {dir_path}")
-            return photos
+            return []
         
-        print(f"📁 Processing {category} photos from {dir_path}")
+        if verbose:
+            print(f"📁 Processing {category} photos from {dir_path}")
         
         # Find all photo files
         photo_files = []
@@ -261,28 +1082,178 @@ class LocalPhotosIndexer:
                     photo_files.extend(subdir.glob(f"*{ext.upper()}"))
         
         # Debug: Show what files were found
-        print(f"   Debug: Found these files:")
-        for file in photo_files:
-            print(f"     - {file}")
+        if verbose:
+            print(f"   Debug: Found these files:")
+            for file in photo_files:
+                print(f"     - {file}")
         
-        # Sort by modification time (newest first)
-        photo_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+        # Sort by modification time (newest first), path breaks ties so every host agrees
+        photo_files.sort(key=lambda x: (-x.stat().st_mtime, x.as_posix()))
         
         # Limit photos per category
-        photo_files = photo_files[:CONFIG['max_photos_per_category']]
-        print(f"   Found {len(photo_files)} photos to process")
+        return photo_files[:CONFIG['max_photos_per_category']]
+    
+    def scan_directory(self, category: str, photo_files: List[Path]) -> List[PhotoRecord]:
+        """Process a category's photo files, skipping files of other shards and of a resumed run"""
+        photos = []
         
-        for i, file_path in enumerate(photo_files, 1):
-            print(f"   Processing {i}/{len(photo_files)}: {file_path.name}")
-            
-            metadata = self.process_photo(file_path, category)
-            if metadata:
-                photos.append(metadata)
+        if CONFIG['shard']:
+            index, count = CONFIG['shard']
+            photo_files = [f for f in photo_files if shard_of(self.relative_source(f), count) == index]
+        resumed = [f for f in photo_files if self.relative_source(f) in self.skip]
+        photo_files = [f for f in photo_files if self.relative_source(f) not in self.skip]
+        print(f"   Found {len(photo_files)} photos to process"
+              + (f" ({len(resumed)} already done)" if resumed else ""))
+        
+        # Reads and writes overlap with rendering; Pillow releases the GIL while
+        # decoding, resizing and encoding, so the render threads run in parallel
+        pipeline = Pipeline([
+            ('read', self.read_stage, CONFIG['io_threads']),
+            ('render', self.render_stage, CONFIG['workers']),
+            ('write', self.write_stage, CONFIG['io_threads'])
+        ], CONFIG['pipeline_queue_size'], on_done=self.finish_photo)
         
+        results = {}
+        try:
+            for done, (index, photo, error) in enumerate(pipeline.run([(f, category) for f in photo_files]), 1):
+                print(f"   Done {done}/{len(photo_files)}: {photo_files[index].name}  (queued: {pipeline.depths()})")
+                if error is None:
+                    results[index] = photo
+        finally:
+            # On Ctrl-C, let the photos in progress finish (and reach the journal) but start no more
+            pipeline.close()
+            self.add_pipeline_stats(pipeline)
+        
+        # Manifest in discovery order, whatever order the photos finished in
+        for index in sorted(results):
+            photos.append(results[index])
+            self.record_manifest_entry(photo_files[index], results[index])
         return photos
     
-    def generate_index(self):
-        """Generate complete photo index"""
+    def add_pipeline_stats(self, pipeline: Pipeline):
+        """Accumulate a category's pipeline stats into the run's"""
+        self.pipeline_elapsed += pipeline.elapsed
+        for name, stage in pipeline.stats.items():
+            total = self.pipeline_stats.setdefault(name, dict(stage, jobs=0, busy=0.0, depth_sum=0, depth_max=0))
+            total['jobs'] += stage['jobs']
+            total['busy'] += stage['busy']
+            total['depth_sum'] += stage['depth_sum']
+            total['depth_max'] = max(total['depth_max'], stage['depth_max'])
+    
+    def relative_source(self, file_path: Path) -> str:
+        """Manifest key for a source file"""
+        return file_path.relative_to(self.source_path).as_posix()
+    
+    def record_manifest_entry(self, file_path: Path, photo: PhotoRecord):
+        """Remember which source file produced an index entry"""
+        stat = file_path.stat()
+        self.manifest[self.relative_source(file_path)] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'photo': photo
+        }
+    
+    def rendition_paths(self, photo: PhotoRecord) -> List[Path]:
+        """Web files written for an index entry (a .dzi stands for its whole pyramid)"""
+        paths = [self.thumbnails_dir / Path(photo.thumbnail).relative_to('photos/thumbnails'),
+                 self.full_dir / photo.filename]
+        if photo.zoom:
+            paths.append(self.zoom_dir / Path(photo.zoom).relative_to('photos/zoom'))
+        return paths
+    
+    def load_journal(self, retry_failed: bool) -> bool:
+        """
+        Take over the photos an interrupted run finished: they go into the manifest and
+        are skipped, as long as their source is unchanged and their renditions are on
+        disk. Failures are skipped too, unless retry_failed.
+        """
+        path = journal_path()
+        if not path.exists():
+            print(f"❌ No journal at {path}: nothing to resume, run without --resume")
+            return False
+        
+        header, done, failed = RunJournal.read(path)
+        if header is None or header.get('shard') != (list(CONFIG['shard']) if CONFIG['shard'] else None):
+            print(f"❌ {path} is from a different run (shard {header and header.get('shard')}), run without --resume")
+            return False
+        if header['settings'] != render_settings():
+            changed = [name for name in RENDER_SETTINGS if header['settings'].get(name) != render_settings()[name]]
+            print(f"❌ Rendering settings changed since the journaled run ({', '.join(changed)}), run without --resume")
+            return False
+        
+        def unchanged(entry) -> bool:
+            source = self.source_path / entry['source']
+            if not source.exists():
+                return False
+            stat = source.stat()
+            return entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime
+        
+        for rel, entry in done.items():
+            photo = PhotoRecord.from_dict(entry['photo'])
+            if unchanged(entry) and all(path.exists() for path in self.rendition_paths(photo)):
+                self.manifest[rel] = {'size': entry['size'], 'mtime': entry['mtime'], 'photo': photo}
+                self.skip.add(rel)
+        
+        skipped_failures = 0
+        if not retry_failed:
+            for rel, entry in failed.items():
+                if unchanged(entry):
+                    self.skip.add(rel)
+                    self.failed[rel] = entry['error']
+                    skipped_failures += 1
+        
+        print(f"⏩ Resuming the run started {header['started']}: {len(self.manifest)} photos done, "
+              f"{len(failed)} failed" + (f" ({skipped_failures} skipped, --retry-failed to retry)"
+                                          if skipped_failures else " (retrying)" if failed else ""))
+        return True
+    
+    def load_manifest(self) -> bool:
+        """Load the manifest written by the last run"""
+        manifest_path = Path(CONFIG['manifest_file'])
+        if not manifest_path.exists():
+            return False
+        self.manifest = self.read_manifest(manifest_path)
+        self.photos = [entry['photo'] for entry in self.manifest.values()]
+        return True
+    
+    @staticmethod
+    def read_manifest(manifest_path: Path) -> Dict:
+        """Manifest (or shard manifest) with its photos as records"""
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        for entry in manifest.values():
+            entry['photo'] = PhotoRecord.from_dict(entry['photo'])
+        return manifest
+    
+    def write_index(self) -> List[Dict]:
+        """
+        Atomically write photos.json (versioned, with a delta), its search index and
+        the manifest; returns the index entries in photos.json order
+        """
+        # Identical files share an ID and are listed once
+        photos = {}
+        for rel, entry in sorted(self.manifest.items()):
+            kept = photos.setdefault(entry['photo'].id, entry['photo'])
+            if kept is not entry['photo']:
+                print(f"⚠️  {rel} is identical to {kept.original_file}, listing it once")
+        self.photos = list(photos.values())
+        
+        index = [photo.to_dict() for photo in self.photos]
+        if CONFIG['related_photos']:
+            load_imaging()
+            if related_photos is not None:
+                related_photos.add_related(index)
+        publish_index(index, CONFIG['output_file'])
+        write_search_index(index, CONFIG['search_index_file'])
+        write_json_atomic(CONFIG['manifest_file'], self.manifest)
+        return index
+    
+    def generate_index(self, resume: bool = False, retry_failed: bool = False):
+        """
+        Generate complete photo index. Progress is journaled as photos finish;
+        `resume` continues an interrupted run, and `retry_failed` also reprocesses
+        the photos that failed in it.
+        """
         print("🔍 Processing local photos for GitHub LFS...")
         
         if not self.source_path.exists():
@@ -292,44 +1263,209 @@ class LocalPhotosIndexer:
                 print(f"   {self.source_path / directory}")
             return
         
+        self.manifest = {}
+        resuming = resume or retry_failed
+        if resuming and not self.load_journal(retry_failed):
+            return
+        
         # Clean existing thumbnails and full directories to avoid stale files
-        # but preserve any other folders in photos/ directory
-        if self.thumbnails_dir.exists():
+        # but preserve any other folders in photos/ directory. Shards may share
+        # an output directory, so --merge removes their stale files instead.
+        # A resumed run keeps the renditions of the photos it takes over
+        clean = not resuming and not CONFIG['shard']
+        if self.thumbnails_dir.exists() and clean:
             print("🧹 Cleaning existing thumbnails...")
             shutil.rmtree(self.thumbnails_dir)
         
-        if self.full_dir.exists():
+        if self.full_dir.exists() and clean:
             print("🧹 Cleaning existing full-size photos...")
             shutil.rmtree(self.full_dir)
         
+        if self.zoom_dir.exists() and clean:
+            print("🧹 Cleaning existing deep zoom pyramids...")
+            shutil.rmtree(self.zoom_dir)
+        
         # Recreate the directories
-        self.thumbnails_dir.mkdir(parents=True, exist_ok=True)
-        self.full_dir.mkdir(parents=True, exist_ok=True)
+        self.prepare_rendering()
+        self.journal = RunJournal(journal_path())
+        if resuming:
+            self.journal.resume()
+        else:
+            self.journal.start({'started': datetime.now().isoformat(timespec='seconds'),
+                                'shard': CONFIG['shard'], 'settings': render_settings()})
         
         # Process each category
-        for category, directory in CONFIG['photo_directories'].items():
-            category_photos = self.scan_directory(directory, category)
-            self.photos.extend(category_photos)
-            print(f"✅ Processed {len(category_photos)} {category} photos")
-        
-        # Sort by date (newest first)
-        self.photos.sort(key=lambda x: x['date'], reverse=True)
+        try:
+            for category, directory in CONFIG['photo_directories'].items():
+                category_photos = self.scan_directory(category, self.discover_files(directory, category))
+                print(f"✅ Processed {len(category_photos)} {category} photos")
+        except KeyboardInterrupt:
+            print(f"\n⏸️  Interrupted: progress is saved in {journal_path()}, "
+                  f"continue with --resume{' --shard ' + '/'.join(map(str, CONFIG['shard'])) if CONFIG['shard'] else ''}")
+            return
+        finally:
+            self.journal.close()
         
+        # Photos taken over from the interrupted run count too
+        self.photos = [entry['photo'] for entry in self.manifest.values()]
         print(f"📊 Total photos processed: {len(self.photos)}")
+        if self.failed:
+            print(f"⚠️  {len(self.failed)} photos failed, e.g. {min(self.failed)}: {self.failed[min(self.failed)]}")
+            print(f"   Fix or remove them and run with --retry-failed to reprocess only those")
+        
+        if CONFIG['shard']:
+            # Partial manifest only; photos.json is written by --merge
+            index, count = CONFIG['shard']
+            write_json_atomic(shard_manifest_path(index, count), self.manifest)
+            print(f"💾 Saved shard {index}/{count} manifest to {shard_manifest_path(index, count)}")
+            return
         
-        # Save to JSON
-        with open(CONFIG['output_file'], 'w') as f:
-            json.dump(self.photos, f, indent=2)
+        # Save to JSON (sorted by date, newest first)
+        index = self.write_index()
         
         print(f"💾 Saved index to {CONFIG['output_file']}")
         
-        # Print summary
+        if CONFIG['build_sprites']:
+            from build_sprites import build_sprites
+            build_sprites(index)
+        
+        self.print_summary()
+    
+    def merge_shards(self) -> bool:
+        """Combine the partial manifests of a sharded run into photos.json and the manifest"""
+        manifest_path = Path(CONFIG['manifest_file'])
+        shard_files = sorted(manifest_path.parent.glob(f"{manifest_path.stem}.shard-*-of-*{manifest_path.suffix}"))
+        if not shard_files:
+            print(f"❌ No shard manifests found next to {manifest_path}")
+            return False
+        
+        counts = {int(f.stem.rsplit('-of-', 1)[1]) for f in shard_files}
+        if len(counts) != 1:
+            print(f"❌ Shard manifests from runs with different shard counts: {sorted(counts)}")
+            return False
+        count = counts.pop()
+        missing = [i for i in range(1, count + 1) if not shard_manifest_path(i, count).exists()]
+        if missing:
+            print(f"❌ Missing shard manifests for {', '.join(f'{i}/{count}' for i in missing)}")
+            return False
+        
+        self.manifest = {}
+        for index in range(1, count + 1):
+            partial = self.read_manifest(shard_manifest_path(index, count))
+            overlap = self.manifest.keys() & partial.keys()
+            if overlap:
+                print(f"❌ Shard {index}/{count} repeats {len(overlap)} files, e.g. {min(overlap)}")
+                return False
+            self.manifest.update(partial)
+            print(f"🧩 Shard {index}/{count}: {len(partial)} photos")
+        
+        # Manifest keys in path order, so the merged files do not depend on shard count
+        self.manifest = dict(sorted(self.manifest.items()))
+        self.photos = [entry['photo'] for entry in self.manifest.values()]
+        
+        # Every entry needs its renditions copied in from the shard that made them
+        referenced = set()
+        for photo in self.photos:
+            referenced.update(self.rendition_paths(photo))
+        absent = [path for path in referenced if not path.exists()]
+        if absent:
+            print(f"❌ {len(absent)} renditions are missing (copy each shard's {self.web_photos_dir}/ here), "
+                  f"e.g. {min(absent)}")
+            return False
+        
+        # Drop renditions left over from earlier runs
+        stale = [f for d in (self.thumbnails_dir, self.full_dir) if d.exists() for f in d.rglob('*')
+                 if f.is_file() and f not in referenced]
+        for path in stale:
+            path.unlink()
+        if self.zoom_dir.exists():
+            for path in self.zoom_dir.rglob('*.dzi'):
+                if path not in referenced:
+                    remove_dzi(path)
+                    stale.append(path)
+        if stale:
+            print(f"🧹 Removed {len(stale)} stale renditions")
+        
+        photo_index = self.write_index()
+        journal = Path(CONFIG['journal_file'])
+        for index in range(1, count + 1):
+            shard_manifest_path(index, count).unlink()
+            shard_journal = journal.with_name(f"{journal.stem}.shard-{index}-of-{count}{journal.suffix}")
+            if shard_journal.exists():
+                shard_journal.unlink()
+        print(f"💾 Saved index to {CONFIG['output_file']} ({len(self.photos)} photos from {count} shards)")
+        
+        if CONFIG['build_sprites']:
+            from build_sprites import build_sprites
+            build_sprites(photo_index)
+        
+        self.print_summary()
+        return True
+    
+    def plan(self):
+        """
+        Print what an update would add, re-render and remove, compared with the last
+        manifest, without importing the imaging libraries or writing anything
+        """
+        started = time.perf_counter()
+        if not self.source_path.exists():
+            print(f"❌ Photos directory not found: {self.source_path}")
+            return
+        if not self.load_manifest():
+            print(f"📭 No manifest at {CONFIG['manifest_file']}: the next run indexes everything")
+        
+        # Cached dimensions give the decode work without opening any photo
+        store = None
+        if Path(CONFIG['metadata_store']).exists():
+            store = self.metadata_store
+        
+        plan = {'add': [], 'change': [], 'remove': []}
+        discovered = set()
+        for category, directory in CONFIG['photo_directories'].items():
+            for file_path in self.discover_files(directory, category, verbose=False):
+                rel = self.relative_source(file_path)
+                discovered.add(rel)
+                stat = file_path.stat()
+                entry = self.manifest.get(rel)
+                if entry is None:
+                    plan['add'].append((rel, file_path, stat))
+                elif entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+                    plan['change'].append((rel, file_path, stat))
+        plan['remove'] = sorted(rel for rel in self.manifest if rel not in discovered)
+        
+        for action, symbol in (('add', '➕'), ('change', '🔄')):
+            for rel, _, _ in plan[action]:
+                print(f"{symbol} {action:<6} {rel}")
+        for rel in plan['remove']:
+            print(f"🗑️  remove {rel}")
+        
+        to_render = plan['add'] + plan['change']
+        read_bytes = sum(stat.st_size for _, _, stat in to_render)
+        megapixels, unknown = 0.0, 0
+        for _, file_path, stat in to_render:
+            cached = store.lookup(str(file_path.resolve()), stat.st_size, mtime_ns=stat.st_mtime_ns) if store else None
+            if cached and cached['width'] and cached['height']:
+                megapixels += cached['width'] * cached['height'] / 1e6
+            else:
+                unknown += 1
+        
+        print(f"\n📋 Plan: {len(plan['add'])} to add, {len(plan['change'])} to re-render, "
+              f"{len(plan['remove'])} to remove, {len(discovered) - len(to_render)} unchanged")
+        if to_render:
+            renditions = 3 if CONFIG['deep_zoom'] else 2
+            print(f"   Work: {len(to_render) * renditions} renditions from {read_bytes / (1024*1024):.1f} MB of sources, "
+                  f"{megapixels:.0f} MP to decode" + (f" (+{unknown} photos of unknown size)" if unknown else ""))
+        print(f"   Planned in {time.perf_counter() - started:.2f}s; "
+              f"--watch applies changes incrementally, a full run re-renders everything")
+    
+    def print_summary(self):
+        """Print per-category counts and output sizes"""
         categories = {}
         locations = set()
         for photo in self.photos:
-            categories[photo['category']] = categories.get(photo['category'], 0) + 1
-            if photo['location'] != 'Unknown':
-                locations.add(photo['location'])
+            categories[photo.category] = categories.get(photo.category, 0) + 1
+            if photo.location != 'Unknown':
+                locations.add(photo.location)
         
         print("\n📈 Summary:")
         for cat, count in categories.items():
@@ -344,8 +1480,182 @@ class LocalPhotosIndexer:
             if f.is_file()
         )
         print(f"   Total web-optimized size: {total_size / (1024*1024):.1f} MB")
+        
+        if self.color_transforms is not None and self.color_transforms.builds:
+            print(f"   Colour management: {self.color_transforms.builds} ICC profiles seen, "
+                  f"{self.color_transforms.hits} conversions reused a cached transform")
+        
+        if self.pipeline_stats:
+            print(f"   Pipeline ({self.pipeline_elapsed:.1f}s):")
+            for line in pipeline_report(self.pipeline_stats, self.pipeline_elapsed, CONFIG['pipeline_queue_size']):
+                print(f"      {line}")
+        
+        if CONFIG['adaptive_quality']:
+            stats = self.encode_stats
+            saved = stats['baseline_bytes'] - stats['bytes']
+            percent = 100 * saved / stats['baseline_bytes'] if stats['baseline_bytes'] else 0
+            print(f"   Adaptive JPEG: saved {saved / (1024*1024):.1f} MB ({percent:.0f}%) "
+                  f"over {stats['renditions']} renditions at fixed quality")
+    
+    def category_for(self, file_path: Path) -> Optional[str]:
+        """
+        Category of a source file, or None if a full scan would not pick it up
+        (wrong folder, unsupported extension, or nested more than one level deep)
+        """
+        try:
+            parts = file_path.relative_to(self.source_path).parts
+        except ValueError:
+            return None
+        
+        if len(parts) not in (2, 3) or file_path.suffix.lower() not in CONFIG['supported_formats']:
+            return None
+        
+        for category, directory in CONFIG['photo_directories'].items():
+            if parts[0] == directory:
+                return category
+        return None
+    
+    def remove_renditions(self, photo: PhotoRecord):
+        """Delete the web files belonging to an index entry, unless another entry shares them"""
+        # Identical sources render to the same content-addressed files
+        if any(entry['photo'].filename == photo.filename for entry in self.manifest.values()):
+            return
+        for path in self.rendition_paths(photo):
+            if path.suffix == '.dzi':
+                remove_dzi(path)
+            elif path.exists():
+                path.unlink()
+    
+    def apply_changes(self, changed_paths) -> bool:
+        """Re-render or drop the index entries for changed source paths"""
+        self.prepare_rendering()
+        changed = False
+        
+        # A directory moved into the tree arrives as one event for the directory
+        expanded = set()
+        for file_path in changed_paths:
+            if file_path.is_dir():
+                expanded.update(p for p in file_path.rglob('*') if p.is_file())
+            else:
+                expanded.add(file_path)
+        
+        for file_path in sorted(expanded):
+            rel = self.relative_source(file_path) if file_path.is_relative_to(self.source_path) else None
+            if rel is None:
+                continue
+            
+            # Deleted (or moved away) file or directory
+            if not file_path.exists():
+                removed = [key for key in self.manifest if key == rel or key.startswith(rel + '/')]
+                for key in removed:
+                    self.remove_renditions(self.manifest.pop(key)['photo'])
+                    print(f"🗑️  Removed {key}")
+                changed |= bool(removed)
+                continue
+            
+            category = self.category_for(file_path)
+            if category is None or not file_path.is_file():
+                continue
+            
+            stat = file_path.stat()
+            entry = self.manifest.get(rel)
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                continue
+            
+            photo = self.process_photo(file_path, category)
+            if not photo:
+                continue
+            
+            self.record_manifest_entry(file_path, photo)
+            
+            # Drop renditions the old entry used if their names changed
+            if entry and entry['photo'].filename != photo.filename:
+                self.remove_renditions(entry['photo'])
+            print(f"{'🔄 Updated' if entry else '➕ Added'} {rel}")
+            changed = True
+        
+        if changed:
+            self.write_index()
+            print(f"💾 Saved index to {CONFIG['output_file']} ({len(self.photos)} photos)")
+        return changed
+    
+    def watch(self):
+        """Keep photos.json and the renditions in sync with the source directory"""
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            print("Missing dependencies. Install with:")
+            print("pip install watchdog")
+            return
+        
+        if not self.load_manifest():
+            print("📭 No manifest from a previous run, doing a full index first")
+            self.generate_index()
+        
+        events = queue.Queue()
+        
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.event_type in ('opened', 'closed_no_write'):
+                    return
+                events.put(Path(event.src_path))
+                if getattr(event, 'dest_path', None):
+                    events.put(Path(event.dest_path))
+        
+        observer = Observer()  # inotify on Linux, FSEvents on macOS
+        observer.schedule(Handler(), str(self.source_path), recursive=True)
+        observer.start()
+        print(f"👀 Watching {self.source_path} (Ctrl-C to stop)")
+        
+        debounce = CONFIG['watch_debounce_seconds']
+        try:
+            while True:
+                # Block until something happens, then wait for the burst to settle
+                batch = {events.get()}
+                while True:
+                    try:
+                        batch.add(events.get(timeout=debounce))
+                    except queue.Empty:
+                        break
+                self.apply_changes(batch)
+        except KeyboardInterrupt:
+            print("\n👋 Stopping watch")
+        finally:
+            observer.stop()
+            observer.join()
 
 def main():
+    parser = argparse.ArgumentParser(description="Local Photos Indexer for GitHub LFS")
+    parser.add_argument('--adaptive-quality', action='store_true',
+                        help="encode each rendition at the lowest quality meeting CONFIG['target_ssim']")
+    parser.add_argument('--deep-zoom', action='store_true',
+                        help="also write a full-resolution DZI tile pyramid per photo for zooming in the lightbox")
+    parser.add_argument('--watch', action='store_true',
+                        help="watch the photos directory and update photos.json as files change")
+    parser.add_argument('--shard', type=parse_shard, metavar='i/N',
+                        help="render only the i-th of N deterministic partitions and write a partial manifest")
+    parser.add_argument('--plan', action='store_true',
+                        help="show what changed since the last run, and the work it implies, without rendering")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted full run from its journal, skipping photos already done")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="like --resume, but also reprocess the photos that failed")
+    parser.add_argument('--merge', action='store_true',
+                        help="combine the partial manifests of a sharded run into photos.json")
+    args = parser.parse_args()
+    
+    if args.adaptive_quality:
+        load_imaging()
+        if np is None:
+            print("Missing dependencies. Install with:")
+            print("pip install numpy")
+            return
+        CONFIG['adaptive_quality'] = True
+    
+    if args.deep_zoom:
+        CONFIG['deep_zoom'] = True
+    
     print("🚀 Local Photos Indexer for GitHub LFS")
     print("=" * 45)
     
@@ -362,8 +1672,23 @@ def main():
     # Initialize indexer
     indexer = LocalPhotosIndexer()
     
+    if args.watch:
+        indexer.watch()
+        return
+    
+    if args.plan:
+        indexer.plan()
+        return
+    
+    if args.merge:
+        indexer.merge_shards()
+        return
+    
+    if args.shard:
+        CONFIG['shard'] = args.shard
+    
     # Generate the index
-    indexer.generate_index()
+    indexer.generate_index(resume=args.resume, retry_failed=args.retry_failed)
     
     print("\n🎉 Photo processing complete!")
     print("\nNext steps:")
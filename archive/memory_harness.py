@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Indexer Memory Harness
+
+Measures the peak memory of local_photos_indexer.py on a generated corpus,
+stage by stage, and fails when a stage goes over its ceiling, so memory
+regressions show up here rather than as an OOM kill on the build container.
+
+Each stage runs in a fresh process, so memory one stage freed but the
+allocator kept does not hide the next stage's. Per stage:
+- rss       peak resident memory above the process's baseline, sampled every
+            few milliseconds (Pillow allocates pixel buffers in C, so decoded
+            images only show up here)
+- python    peak of Python allocations, from tracemalloc
+
+Stages:
+- jpeg          process_photo on a large JPEG (EXIF-rotated)
+- rgba_png      process_photo on a large RGBA PNG (alpha flattened onto white)
+- png           process_photo on a large RGB PNG
+- full_run      generate_index over the whole corpus (pipeline and workers)
+- index_write   write_index with --index-size photos in the manifest
+
+Requirements:
+pip install pillow exifread
+pip install psutil  # optional, for RSS sampling where /proc is not available
+
+Usage:
+python memory_harness.py                               # default corpus and ceilings
+python memory_harness.py --megapixels 50 --ceiling rgba_png=900
+python memory_harness.py --stages index_write --index-size 50000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+HARNESS_CONFIG = {
+    'megapixels': 24,         # Size of the large test photos
+    'photos': 12,             # Extra 6 MP JPEGs in the corpus for full_run
+    'index_size': 20000,      # Photos in the manifest for index_write
+    'sample_interval': 0.005,  # Seconds between RSS samples
+    
+    # Peak RSS above baseline, in MB, for the default corpus (about 1.5x what it takes today)
+    'ceilings_mb': {
+        'jpeg': 260,
+        'rgba_png': 350,
+        'png': 260,
+        'full_run': 768,      # Grows with CONFIG['workers'] and memory_budget_mb
+        'index_write': 420,
+    },
+}
+
+STAGES = ('jpeg', 'rgba_png', 'png', 'full_run', 'index_write')
+
+# Large corpus file each per-photo stage processes (relative to the corpus root)
+STAGE_FILES = {
+    'jpeg': 'Faces/large.jpg',
+    'rgba_png': 'Street/transparent.png',
+    'png': 'Nature/large.png',
+}
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def current_rss() -> Optional[int]:
+    """Resident memory of this process in bytes, or None where it cannot be read"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return None
+
+def max_rss() -> int:
+    """Lifetime peak resident memory of this process in bytes (kernel-tracked)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class RSSSampler:
+    """Background thread recording the highest RSS seen while it runs"""
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.peak = 0
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+    
+    def run(self):
+        while True:
+            rss = current_rss()
+            if rss is None:
+                return
+            self.peak = max(self.peak, rss)
+            self.samples += 1
+            if self.stop_event.wait(self.interval):
+                return
+    
+    def __enter__(self):
+        self.thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+
+def noisy_image(size: tuple, mode: str):
+    """Gradients plus a noise channel: cheap to generate, not trivially compressible"""
+    from PIL import Image
+    
+    gradient = Image.linear_gradient('L').resize(size)
+    bands = [gradient, gradient.transpose(Image.Transpose.ROTATE_180), Image.effect_noise(size, 40)]
+    if mode == 'RGBA':
+        # Opaque centre fading to transparent edges
+        bands.append(Image.radial_gradient('L').resize(size).point(lambda v: 255 - v))
+    return Image.merge(mode, bands)
+
+def generate_corpus(root: Path, megapixels: float, photos: int):
+    """Large JPEG, RGBA PNG and RGB PNG, plus `photos` 6 MP JPEGs spread over the categories"""
+    from PIL import Image
+    
+    def size_for(mp: float) -> tuple:
+        width = int((mp * 1_000_000 * 3 / 2) ** 0.5)
+        return width, int(width * 2 / 3)
+    
+    for directory in ('Faces', 'Street', 'Nature'):
+        (root / directory).mkdir(parents=True, exist_ok=True)
+    
+    large = size_for(megapixels)
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated: exercises the transpose after resizing
+    noisy_image(large, 'RGB').save(root / STAGE_FILES['jpeg'], quality=90, exif=exif)
+    noisy_image(large, 'RGBA').save(root / STAGE_FILES['rgba_png'], compress_level=1)
+    noisy_image(large, 'RGB').save(root / STAGE_FILES['png'], compress_level=1)
+    
+    small = size_for(6)
+    for i in range(photos):
+        directory = ('Faces', 'Street', 'Nature')[i % 3]
+        noisy_image(small, 'RGB').rotate(i * 30).save(root / directory / f"photo_{i:03d}.jpg", quality=90)
+
+def configure_indexer(corpus: Path):
+    """local_photos_indexer with the corpus as source and all outputs in the working directory"""
+    import local_photos_indexer
+    local_photos_indexer.CONFIG.update({
+        'photos_source_dir': str(corpus),
+        'build_sprites': False,
+    })
+    local_photos_indexer.load_imaging()
+    return local_photos_indexer
+
+def synthetic_manifest(indexer_module, count: int) -> Dict:
+    """Manifest of `count` distinct photos, shaped like a real run's"""
+    from photo_record import PhotoRecord
+    
+    manifest = {}
+    for i in range(count):
+        category = ('faces', 'street', 'nature')[i % 3]
+        digest = hashlib.sha1(str(i).encode()).hexdigest()
+        manifest[f"{category.title()}/photo_{i:06d}.jpg"] = {
+            'size': 4_000_000 + i,
+            'mtime': 1_700_000_000.0 + i,
+            'photo': PhotoRecord(
+                id=indexer_module.content_id(digest),
+                title=f"Photo {i}",
+                category=category,
+                thumbnail=f"./photos/thumbnails/{digest[:2]}/{digest[:20]}.jpg",
+                full=f"./photos/full/{digest[:2]}/{digest[:20]}.jpg",
+                lat=35.0 + (i % 100) / 10 if i % 2 else None,
+                lng=139.0 + (i % 70) / 10 if i % 2 else None,
+                location=f"Place {i % 250}",
+                date=f"{2015 + i % 10}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+                filename=f"{digest[:2]}/{digest[:20]}.jpg",
+                original_file=f"photo_{i:06d}.jpg",
+                palette=[f"#{(i * 2654435761) % 0xffffff:06x}", f"#{(i * 40503) % 0xffffff:06x}"],
+                luminance=round((i % 100) / 100, 3),
+                sharpness=float(i % 500),
+            ),
+        }
+    return manifest
+
+def run_stage(stage: str, corpus: Path, index_size: int) -> Dict:
+    """Run one stage in this process (cwd is its working directory) and measure it"""
+    lpi = configure_indexer(corpus)
+    indexer = lpi.LocalPhotosIndexer()
+    indexer.prepare_rendering()
+    megapixels = None
+    
+    if stage in STAGE_FILES:
+        source = corpus / STAGE_FILES[stage]
+        from PIL import Image
+        with Image.open(source) as img:
+            megapixels = img.size[0] * img.size[1] / 1_000_000
+        category = indexer.category_for(source)
+        work = lambda: indexer.process_photo(source, category)
+    elif stage == 'full_run':
+        work = indexer.generate_index
+    else:
+        indexer.manifest = synthetic_manifest(lpi, index_size)
+        work = indexer.write_index
+    
+    baseline = current_rss() or max_rss()
+    tracemalloc.start()
+    started = time.perf_counter()
+    with RSSSampler(HARNESS_CONFIG['sample_interval']) as sampler:
+        result = work()
+    elapsed = time.perf_counter() - started
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    if stage in STAGE_FILES and result is None:
+        raise RuntimeError(f"process_photo failed on {STAGE_FILES[stage]}")
+    if stage == 'index_write' and len(result) != index_size:
+        raise RuntimeError(f"index has {len(result)} photos, expected {index_size}")
+    
+    # Samples can miss a short spike; the kernel's lifetime peak cannot, but it
+    # includes startup, so it only counts when it is above everything sampled
+    peak = max(sampler.peak, max_rss())
+    return {
+        'stage': stage,
+        'rss_mb': (peak - baseline) / (1024 * 1024),
+        'python_mb': python_peak / (1024 * 1024),
+        'megapixels': megapixels,
+        'seconds': elapsed,
+        'samples': sampler.samples,
+    }
+
+def measure(stage: str, corpus: Path, work_root: Path, index_size: int) -> Dict:
+    """Run a stage in a child process; a crash (or OOM kill) is reported as an error"""
+    workdir = work_root / stage
+    workdir.mkdir()
+    result_file = workdir / 'result.json'
+    command = [sys.executable, os.path.abspath(__file__), '--run-stage', stage,
+               '--corpus', str(corpus), '--index-size', str(index_size), '--result-file', str(result_file)]
+    process = subprocess.run(command, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if process.returncode != 0 or not result_file.exists():
+        last_line = (process.stderr.strip().splitlines() or [f"exit status {process.returncode}"])[-1]
+        return {'stage': stage, 'error': last_line}
+    with open(result_file, 'r') as f:
+        return json.load(f)
+
+def report(results: List[Dict], ceilings: Dict[str, float], index_size: int) -> bool:
+    """Print the results table; returns whether every stage stayed under its ceiling"""
+    print(f"\n{'stage':<12} {'rss MB':>8} {'python MB':>10} {'MB/MP':>7} {'ceiling':>8} {'time':>7}")
+    ok = True
+    for result in results:
+        stage = result['stage']
+        ceiling = ceilings.get(stage)
+        if 'error' in result:
+            ok = False
+            print(f"{stage:<12} ❌ {result['error']}")
+            continue
+        
+        per_mp = f"{result['rss_mb'] / result['megapixels']:.1f}" if result['megapixels'] else '-'
+        over = ceiling is not None and result['rss_mb'] > ceiling
+        ok &= not over
+        print(f"{stage:<12} {result['rss_mb']:>8.0f} {result['python_mb']:>10.1f} {per_mp:>7} "
+              f"{f'{ceiling:g}' if ceiling is not None else '-':>8} {result['seconds']:>6.1f}s{'  ❌ over ceiling' if over else ''}")
+        if stage == 'index_write':
+            print(f"{'':<12} {result['rss_mb'] * 1000 / index_size:>8.1f} MB per 1000 photos")
+    return ok
+
+def parse_ceiling(value: str):
+    """STAGE=MB"""
+    stage, _, megabytes = value.partition('=')
+    if stage not in STAGES:
+        raise argparse.ArgumentTypeError(f"unknown stage {stage!r} (one of {', '.join(STAGES)})")
+    try:
+        return stage, float(megabytes)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ceiling must be STAGE=MB, got {value!r}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of the local indexer, per stage, against ceilings")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--megapixels', type=float, default=HARNESS_CONFIG['megapixels'],
+                        help="size of the large test photos")
+    parser.add_argument('--photos', type=int, default=HARNESS_CONFIG['photos'],
+                        help="extra 6 MP photos in the corpus for full_run")
+    parser.add_argument('--index-size', type=int, default=HARNESS_CONFIG['index_size'],
+                        help="photos in the manifest for index_write")
+    parser.add_argument('--ceiling', type=parse_ceiling, action='append', default=[], metavar='STAGE=MB',
+                        help="override a stage's peak RSS ceiling")
+    parser.add_argument('--corpus', help="reuse a generated corpus directory instead of a temporary one")
+    parser.add_argument('--run-stage', choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    if args.run_stage:
+        result = run_stage(args.run_stage, Path(args.corpus), args.index_size)
+        with open(args.result_file, 'w') as f:
+            json.dump(result, f)
+        return
+    
+    if current_rss() is None:
+        print("⚠️  RSS cannot be sampled here (no /proc, psutil not installed): peaks come from getrusage only")
+    
+    ceilings = {**HARNESS_CONFIG['ceilings_mb'], **dict(args.ceiling)}
+    work_root = Path(tempfile.mkdtemp(prefix='memory_harness_'))
+    try:
+        corpus = Path(args.corpus) if args.corpus else work_root / 'corpus'
+        if not (corpus / STAGE_FILES['jpeg']).exists():
+            print(f"🏭 Generating corpus in {corpus} ({args.megapixels:g} MP, {args.photos} extra photos)...")
+            generate_corpus(corpus, args.megapixels, args.photos)
+        corpus = corpus.resolve()
+        
+        results = []
+        for stage in args.stages:
+            print(f"📏 {stage}...")
+            results.append(measure(stage, corpus, work_root, args.index_size))
+        ok = report(results, ceilings, args.index_size)
+    finally:
+        shutil.rmtree(work_root)
+    
+    if not ok:
+        print("\n❌ Memory ceiling exceeded")
+        sys.exit(1)
+    print("\n✅ All stages within their memory ceilings")
+
+if __name__ == "__main__":
+    main()
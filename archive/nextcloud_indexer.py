@@ -12,25 +12,39 @@ Usage:
 1. Configure the settings below
 2. Run: python nextcloud_indexer.py
 3. Upload the generated photos.json to your GitHub repo
+
+Runs are incremental: each category directory is listed with one recursive
+PROPFIND, and only files whose ETag, size or modification time differ from
+the manifest of the last run are downloaded. Files gone from NextCloud are
+dropped from the index. An unchanged library costs one request per category.
+
+python nextcloud_indexer.py --full   # ignore the manifest and re-read every photo
 """
 
+import importlib.util
 import json
 import os
 import re
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
 
 try:
-    from PIL import Image
-    from PIL.ExifTags import TAGS, GPSTAGS
-    import exifread
     from webdav4.client import Client
 except ImportError:
+    Client = None
+
+# Pillow and exifread are imported when a photo is first read, not at startup
+if Client is None or not all(importlib.util.find_spec(name) for name in ('PIL', 'exifread')):
     print("Missing dependencies. Install with:")
     print("pip install pillow exifread webdav4")
     exit(1)
 
+from photo_metadata_store import PhotoMetadataStore, read_photo_metadata
+from photo_record import PhotoRecord, to_json
+from index_deltas import content_id, publish_index, write_json
+
 # Configuration - Update these for your setup
 CONFIG = {
     # NextCloud WebDAV settings
@@ -54,6 +68,8 @@ CONFIG = {
     
     # Output settings
     'output_file': 'photos.json',
+    'manifest_file': 'nextcloud_manifest.json',  # Remote path -> ETag/size/modified and index entry
+    'metadata_store': 'photo_metadata.sqlite',  # Shared EXIF/dimension/hash cache
     'max_photos_per_category': 500,  # Limit to prevent huge JSON files
     'supported_formats': ['.jpg', '.jpeg', '.png', '.webp'],
     
@@ -63,11 +79,20 @@ CONFIG = {
     'thumbnail_dir': 'thumbnails'
 }
 
+# Only the properties the sync compares, rather than every property of every file
+PROPFIND_BODY = """<?xml version="1.0" encoding="utf-8"?>
+<d:propfind xmlns:d="DAV:">
+  <d:prop><d:resourcetype/><d:getetag/><d:getcontentlength/><d:getlastmodified/></d:prop>
+</d:propfind>"""
+
 class NextCloudPhotoIndexer:
     def __init__(self):
         self.client = None
         self.photos = []
-        
+        self.metadata_store = PhotoMetadataStore(CONFIG['metadata_store'])
+        self.manifest = {}  # Remote path -> {'category', 'size', 'etag', 'modified', 'photo'}
+        self.requests = 0   # WebDAV requests made by the sync
+    
     def connect_to_nextcloud(self) -> bool:
         """Connect to NextCloud via WebDAV"""
         try:
@@ -76,7 +101,7 @@ class NextCloudPhotoIndexer:
                 auth=(CONFIG['username'], CONFIG['password'])
             )
             # Test connection
-            self.client.ls('/')
+            self.client.propfind('/', headers={'Depth': '0'})
             print("✅ Connected to NextCloud")
             return True
         except Exception as e:
@@ -84,59 +109,29 @@ class NextCloudPhotoIndexer:
             print("Make sure to use an app password, not your main password")
             return False
     
-    def extract_gps_from_exif(self, exif_data) -> Optional[Tuple[float, float]]:
-        """Extract GPS coordinates from EXIF data"""
+    def extract_photo_metadata(self, file_path: str, category: str, size: int, etag: str,
+                               directory: str = '') -> Optional[PhotoRecord]:
+        """Extract metadata from a photo file, given its size and ETag from the listing"""
         try:
-            if 'GPS GPSLatitude' in exif_data and 'GPS GPSLongitude' in exif_data:
-                lat_ref = str(exif_data.get('GPS GPSLatitudeRef', 'N'))
-                lat_vals = exif_data['GPS GPSLatitude'].values
-                
-                lng_ref = str(exif_data.get('GPS GPSLongitudeRef', 'E'))
-                lng_vals = exif_data['GPS GPSLongitude'].values
-                
-                # Convert to decimal degrees
-                lat = float(lat_vals[0]) + float(lat_vals[1])/60 + float(lat_vals[2])/3600
-                lng = float(lng_vals[0]) + float(lng_vals[1])/60 + float(lng_vals[2])/3600
-                
-                if lat_ref == 'S':
-                    lat = -lat
-                if lng_ref == 'W':
-                    lng = -lng
-                    
-                return lat, lng
-        except:
-            pass
-        return None
-    
-    def extract_photo_metadata(self, file_path: str, category: str) -> Optional[Dict]:
-        """Extract metadata from a photo file"""
-        try:
-            # Download file temporarily to read EXIF
-            temp_file = f"/tmp/{os.path.basename(file_path)}"
-            self.client.download_file(file_path, temp_file)
+            # Remote files are identified by path + size + ETag; only download
+            # the photo when the shared metadata store has nothing current for it
+            source = f"nextcloud:{file_path}"
             
-            # Extract EXIF data
-            exif_data = {}
-            date_taken = None
-            gps_coords = None
+            metadata = self.metadata_store.lookup(source, size, etag=etag)
+            if metadata is None:
+                # Download file temporarily to read EXIF
+                temp_file = f"/tmp/{os.path.basename(file_path)}"
+                self.requests += 1
+                self.client.download_file(file_path, temp_file)
+                try:
+                    metadata = read_photo_metadata(Path(temp_file))
+                finally:
+                    # Clean up temp file
+                    os.remove(temp_file)
+                self.metadata_store.save(source, size, metadata, etag=etag)
             
-            with open(temp_file, 'rb') as f:
-                tags = exifread.process_file(f)
-                exif_data = {str(k): str(v) for k, v in tags.items()}
-                
-                # Extract date
-                if 'EXIF DateTimeOriginal' in tags:
-                    date_str = str(tags['EXIF DateTimeOriginal'])
-                    try:
-                        date_taken = datetime.strptime(date_str, '%Y:%m:%d %H:%M:%S').strftime('%Y-%m-%d')
-                    except:
-                        pass
-                
-                # Extract GPS
-                gps_coords = self.extract_gps_from_exif(tags)
-            
-            # Clean up temp file
-            os.remove(temp_file)
+            date_taken = metadata['date']
+            gps_coords = (metadata['lat'], metadata['lng']) if metadata['lat'] is not None else None
             
             # Generate URLs
             filename = os.path.basename(file_path)
@@ -146,9 +141,13 @@ class NextCloudPhotoIndexer:
                 print(f"⚠️  No public share URL configured for category: {category}")
                 return None
             
-            # Construct public URLs
-            thumbnail_url = f"{base_share_url}/download/{filename}"
-            full_url = f"{base_share_url}/download/{filename}"
+            # Construct public URLs; files in subfolders of the share are addressed by path
+            subfolder = os.path.dirname(os.path.relpath(file_path, directory)) if directory else ''
+            if subfolder:
+                thumbnail_url = f"{base_share_url}/download?path=/{quote(subfolder)}&files={quote(filename)}"
+            else:
+                thumbnail_url = f"{base_share_url}/download/{filename}"
+            full_url = thumbnail_url
             
             # Extract location from GPS or use default
             location = "Unknown"
@@ -156,71 +155,136 @@ class NextCloudPhotoIndexer:
                 # You could use reverse geocoding here with a service like Nominatim
                 location = f"{gps_coords[0]:.4f}, {gps_coords[1]:.4f}"
             
-            return {
-                'id': len(self.photos) + 1,
-                'title': os.path.splitext(filename)[0].replace('_', ' ').replace('-', ' ').title(),
-                'category': category,
-                'thumbnail': thumbnail_url,
-                'full': full_url,
-                'lat': gps_coords[0] if gps_coords else None,
-                'lng': gps_coords[1] if gps_coords else None,
-                'location': location,
-                'date': date_taken or 'Unknown',
-                'filename': filename
-            }
-            
+            return PhotoRecord(
+                id=content_id(metadata['sha1']),
+                title=os.path.splitext(filename)[0].replace('_', ' ').replace('-', ' ').title(),
+                category=category,
+                thumbnail=thumbnail_url,
+                full=full_url,
+                lat=gps_coords[0] if gps_coords else None,
+                lng=gps_coords[1] if gps_coords else None,
+                location=location,
+                date=date_taken or 'Unknown',
+                filename=filename
+            )
+        
         except Exception as e:
             print(f"❌ Error processing {file_path}: {e}")
             return None
     
-    def scan_directory(self, directory: str, category: str) -> List[Dict]:
-        """Scan a directory for photos"""
-        photos = []
+    def propfind(self, path: str, depth: str) -> List[Dict]:
+        """Entries (the path itself included) from one PROPFIND"""
+        self.requests += 1
+        result = self.client.propfind(path, data=PROPFIND_BODY, follow_redirects=True,
+                                      headers={'Depth': depth, 'Content-Type': 'application/xml'})
+        entries = []
+        for response in result.responses.values():
+            properties = response.properties
+            entries.append({
+                'path': response.path_relative_to(self.client.base_url).strip('/'),
+                'type': properties.resource_type,
+                'size': properties.content_length or 0,
+                'etag': properties.etag or '',
+                'modified': properties.modified.isoformat() if properties.modified else None,
+            })
+        return entries
+    
+    def list_remote(self, directory: str) -> Dict[str, Dict]:
+        """Photo files anywhere under a directory: path -> size, ETag and modification time"""
         try:
-            print(f"📁 Scanning {directory} for {category} photos...")
-            
-            files = self.client.ls(directory)
-            photo_files = [
-                f for f in files 
-                if any(f.lower().endswith(ext) for ext in CONFIG['supported_formats'])
-            ]
-            
-            print(f"   Found {len(photo_files)} photos")
-            
-            # Limit photos per category
-            photo_files = photo_files[:CONFIG['max_photos_per_category']]
-            
-            for i, file_path in enumerate(photo_files, 1):
-                print(f"   Processing {i}/{len(photo_files)}: {os.path.basename(file_path)}")
-                
-                full_path = f"{directory}/{file_path}" if not directory.endswith('/') else f"{directory}{file_path}"
-                metadata = self.extract_photo_metadata(full_path, category)
-                
-                if metadata:
-                    photos.append(metadata)
-                    
+            entries = self.propfind(directory, 'infinity')
         except Exception as e:
-            print(f"❌ Error scanning directory {directory}: {e}")
+            # Some servers refuse infinite depth: walk the tree a level at a time
+            print(f"   Recursive listing refused ({e}), listing folder by folder")
+            entries, pending = [], [directory.strip('/')]
+            while pending:
+                current = pending.pop()
+                for entry in self.propfind(current, '1'):
+                    if entry['type'] == 'directory' and entry['path'] != current:
+                        pending.append(entry['path'])
+                    entries.append(entry)
+        
+        return {
+            entry['path']: {'size': entry['size'], 'etag': entry['etag'], 'modified': entry['modified']}
+            for entry in entries
+            if entry['type'] == 'file'
+            and os.path.splitext(entry['path'])[1].lower() in CONFIG['supported_formats']
+        }
+    
+    def load_manifest(self) -> Dict:
+        """Manifest of the previous run, with its photos as records"""
+        if not os.path.exists(CONFIG['manifest_file']):
+            return {}
+        with open(CONFIG['manifest_file'], 'r') as f:
+            manifest = json.load(f)
+        for entry in manifest.values():
+            entry['photo'] = PhotoRecord.from_dict(entry['photo'])
+        return manifest
+    
+    def sync_directory(self, directory: str, category: str, previous: Dict) -> Dict[str, int]:
+        """
+        Bring a category's manifest entries up to date with NextCloud, downloading
+        only new and changed files; returns counts of what changed
+        """
+        counts = {'added': 0, 'changed': 0, 'unchanged': 0}
+        print(f"📁 Syncing {directory} for {category} photos...")
+        try:
+            remote = self.list_remote(directory)
+        except Exception as e:
+            # Keep what the last run found rather than dropping the category
+            print(f"❌ Error listing directory {directory}: {e}")
+            self.manifest.update({path: entry for path, entry in previous.items() if entry['category'] == category})
+            return counts
+        
+        print(f"   Found {len(remote)} photos")
+        
+        # Limit photos per category
+        for path in sorted(remote)[:CONFIG['max_photos_per_category']]:
+            info = remote[path]
+            old = previous.get(path)
+            if old is not None and old['category'] == category and \
+                    (old['etag'], old['size'], old['modified']) == (info['etag'], info['size'], info['modified']):
+                self.manifest[path] = old
+                counts['unchanged'] += 1
+                continue
             
-        return photos
+            print(f"   Processing {path}")
+            photo = self.extract_photo_metadata(path, category, info['size'], info['etag'], directory.strip('/'))
+            if photo:
+                self.manifest[path] = {'category': category, **info, 'photo': photo}
+                counts['changed' if old is not None else 'added'] += 1
+        
+        return counts
     
-    def generate_index(self):
-        """Generate the complete photo index"""
+    def generate_index(self, full: bool = False):
+        """Generate the photo index, re-reading only what changed on NextCloud (everything with `full`)"""
         print("🔍 Generating photo index...")
         
+        previous = {} if full else self.load_manifest()
+        self.manifest = {}
+        totals = {'added': 0, 'changed': 0, 'unchanged': 0}
         for category, directory in CONFIG['photo_directories'].items():
-            category_photos = self.scan_directory(directory, category)
-            self.photos.extend(category_photos)
-            print(f"✅ Added {len(category_photos)} {category} photos")
+            counts = self.sync_directory(directory, category, previous)
+            for key, count in counts.items():
+                totals[key] += count
+            print(f"✅ {category}: {counts['added']} added, {counts['changed']} changed, {counts['unchanged']} unchanged")
+        removed = len([path for path in previous if path not in self.manifest])
         
-        # Sort photos by date (newest first)
-        self.photos.sort(key=lambda x: x['date'], reverse=True)
+        # Identical files share an ID and are listed once
+        photos = {}
+        for path, entry in sorted(self.manifest.items()):
+            kept = photos.setdefault(entry['photo'].id, entry['photo'])
+            if kept is not entry['photo']:
+                print(f"⚠️  {path} is identical to another photo, listing it once")
+        self.photos = list(photos.values())
         
         print(f"📊 Total photos indexed: {len(self.photos)}")
+        print(f"🔄 Sync: +{totals['added']} ~{totals['changed']} -{removed}, "
+              f"{totals['unchanged']} unchanged, {self.requests} requests")
         
-        # Save to JSON
-        with open(CONFIG['output_file'], 'w') as f:
-            json.dump(self.photos, f, indent=2)
+        # Save to JSON (sorted by date, newest first), versioned with a delta for returning visitors
+        publish_index([photo.to_dict() for photo in self.photos], CONFIG['output_file'])
+        write_json(Path(CONFIG['manifest_file']), self.manifest, indent=2, default=to_json)
         
         print(f"💾 Saved index to {CONFIG['output_file']}")
         
@@ -228,16 +292,16 @@ class NextCloudPhotoIndexer:
         categories = {}
         locations = set()
         for photo in self.photos:
-            categories[photo['category']] = categories.get(photo['category'], 0) + 1
-            if photo['location'] != 'Unknown':
-                locations.add(photo['location'])
+            categories[photo.category] = categories.get(photo.category, 0) + 1
+            if photo.location != 'Unknown':
+                locations.add(photo.location)
         
         print("\n📈 Summary:")
         for cat, count in categories.items():
             print(f"   {cat}: {count} photos")
         print(f"   Locations with GPS: {len(locations)}")
 
-def main():
+def main(full: bool = False):
     print("🚀 NextCloud Photography Portfolio Indexer")
     print("=" * 50)
     
@@ -263,7 +327,7 @@ def main():
         return
     
     # Generate the index
-    indexer.generate_index()
+    indexer.generate_index(full)
     
     print("\n🎉 Index generation complete!")
     print(f"\nNext steps:")
@@ -301,4 +365,4 @@ if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == '--create-config':
         create_sample_config()
     else:
-        main()
\ No newline at end of file
+        main(full='--full' in sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Photo Metadata Store
+
+Shared on-disk cache of the metadata the indexers read from photo files
+(date taken, GPS, orientation, dimensions and content hash), so re-indexing
+an unchanged library never opens the photos again.
+
+Entries are keyed by source identity:
+- local files: absolute path + size + mtime
+- remote files (NextCloud): remote path + size + ETag
+
+Requirements:
+pip install pillow exifread
+
+Usage:
+python photo_metadata_store.py [photo_metadata.sqlite]   # show what is cached
+"""
+
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_DB_PATH = 'photo_metadata.sqlite'
+
+# Columns holding parsed metadata (everything except the identity columns)
+METADATA_FIELDS = ('date', 'lat', 'lng', 'orientation', 'width', 'height', 'sha1')
+
+def extract_gps_from_exif(exif_data) -> Optional[Tuple[float, float]]:
+    """Extract GPS coordinates from EXIF data"""
+    try:
+        if 'GPS GPSLatitude' in exif_data and 'GPS GPSLongitude' in exif_data:
+            lat_ref = str(exif_data.get('GPS GPSLatitudeRef', 'N'))
+            lat_vals = exif_data['GPS GPSLatitude'].values
+            
+            lng_ref = str(exif_data.get('GPS GPSLongitudeRef', 'E'))
+            lng_vals = exif_data['GPS GPSLongitude'].values
+            
+            # Convert to decimal degrees
+            lat = float(lat_vals[0]) + float(lat_vals[1])/60 + float(lat_vals[2])/3600
+            lng = float(lng_vals[0]) + float(lng_vals[1])/60 + float(lng_vals[2])/3600
+            
+            if lat_ref == 'S':
+                lat = -lat
+            if lng_ref == 'W':
+                lng = -lng
+            
+            return lat, lng
+    except Exception as e:
+        print(f"GPS extraction error: {e}")
+    return None
+
+def read_photo_metadata(file_path: Path) -> Dict:
+    """Read date, GPS, orientation, dimensions and SHA-1 from a photo file"""
+    import exifread
+    from PIL import Image
+    
+    metadata = dict.fromkeys(METADATA_FIELDS)
+    
+    with open(file_path, 'rb') as f:
+        tags = exifread.process_file(f, details=False)
+    
+    # Extract date
+    for tag in ('EXIF DateTimeOriginal', 'Image DateTime'):
+        if tag in tags:
+            try:
+                metadata['date'] = datetime.strptime(str(tags[tag]), '%Y:%m:%d %H:%M:%S').strftime('%Y-%m-%d')
+                break
+            except ValueError:
+                pass
+    
+    # Extract GPS
+    gps_coords = extract_gps_from_exif(tags)
+    if gps_coords:
+        metadata['lat'], metadata['lng'] = gps_coords
+    
+    if 'Image Orientation' in tags:
+        metadata['orientation'] = int(tags['Image Orientation'].values[0])
+    
+    # Dimensions from the header only (RAW files Pillow cannot open stay unknown)
+    try:
+        with Image.open(file_path) as img:
+            metadata['width'], metadata['height'] = img.size
+    except Exception:
+        pass
+    
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha1.update(chunk)
+    metadata['sha1'] = sha1.hexdigest()
+    
+    return metadata
+
+class PhotoMetadataStore:
+    """SQLite-backed metadata cache shared by all indexers (safe across threads)"""
+    
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS photo_metadata (
+                source TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER,
+                etag TEXT,
+                date TEXT,
+                lat REAL,
+                lng REAL,
+                orientation INTEGER,
+                width INTEGER,
+                height INTEGER,
+                sha1 TEXT,
+                indexed_at TEXT NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS photo_metadata_sha1 ON photo_metadata (sha1)')
+        self.conn.commit()
+    
+    def close(self):
+        self.conn.close()
+    
+    def lookup(self, source: str, size: int, mtime_ns: Optional[int] = None,
+               etag: Optional[str] = None) -> Optional[Dict]:
+        """Cached metadata for a source, or None if unknown or changed since it was read"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT * FROM photo_metadata WHERE source = ?', (source,)
+            ).fetchone()
+        
+        if row is None or row['size'] != size:
+            return None
+        if etag is not None and row['etag'] != etag:
+            return None
+        if mtime_ns is not None and row['mtime_ns'] != mtime_ns:
+            return None
+        return {field: row[field] for field in METADATA_FIELDS}
+    
+    def save(self, source: str, size: int, metadata: Dict, mtime_ns: Optional[int] = None,
+             etag: Optional[str] = None):
+        """Store (or replace) the metadata for a source"""
+        with self.lock:
+            self.conn.execute(
+                f'''INSERT OR REPLACE INTO photo_metadata
+                    (source, size, mtime_ns, etag, {', '.join(METADATA_FIELDS)}, indexed_at)
+                    VALUES (?, ?, ?, ?, {', '.join('?' * len(METADATA_FIELDS))}, ?)''',
+                (source, size, mtime_ns, etag,
+                 *(metadata.get(field) for field in METADATA_FIELDS),
+                 datetime.now().isoformat(timespec='seconds'))
+            )
+            self.conn.commit()
+    
+    def get_local(self, file_path: Path) -> Dict:
+        """Metadata for a local file, reading the file only when the cache is stale"""
+        stat = file_path.stat()
+        source = str(file_path.resolve())
+        
+        metadata = self.lookup(source, stat.st_size, mtime_ns=stat.st_mtime_ns)
+        if metadata is None:
+            metadata = read_photo_metadata(file_path)
+            self.save(source, stat.st_size, metadata, mtime_ns=stat.st_mtime_ns)
+        return metadata
+    
+    def forget(self, sources: List[str]):
+        """Drop entries for sources that no longer exist"""
+        with self.lock:
+            self.conn.executemany('DELETE FROM photo_metadata WHERE source = ?', [(s,) for s in sources])
+            self.conn.commit()
+    
+    def query(self, source_prefix: Optional[str] = None, has_gps: Optional[bool] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None,
+              sha1: Optional[str] = None) -> List[Dict]:
+        """Cached entries matching all given filters (dates are inclusive YYYY-MM-DD)"""
+        clauses, params = [], []
+        if source_prefix is not None:
+            clauses.append("source LIKE ? ESCAPE '\\'")
+            params.append(source_prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+        if has_gps is not None:
+            clauses.append('lat IS NOT NULL' if has_gps else 'lat IS NULL')
+        if date_from is not None:
+            clauses.append('date >= ?')
+            params.append(date_from)
+        if date_to is not None:
+            clauses.append('date <= ?')
+            params.append(date_to)
+        if sha1 is not None:
+            clauses.append('sha1 = ?')
+            params.append(sha1)
+        
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self.lock:
+            rows = self.conn.execute(f'SELECT * FROM photo_metadata {where} ORDER BY source', params).fetchall()
+        return [dict(row) for row in rows]
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_PATH
+    if not os.path.exists(db_path):
+        print(f"❌ No metadata store at {db_path}")
+        return
+    
+    store = PhotoMetadataStore(db_path)
+    entries = store.query()
+    with_gps = store.query(has_gps=True)
+    remote = [e for e in entries if e['etag'] is not None]
+    
+    print(f"🗄️  Photo metadata store: {db_path}")
+    print(f"   Entries: {len(entries)} ({len(remote)} remote)")
+    print(f"   With GPS: {len(with_gps)}")
+    dates = sorted(e['date'] for e in entries if e['date'])
+    if dates:
+        print(f"   Dates: {dates[0]} → {dates[-1]}")
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Photo Record
+
+The one record type every indexer builds for a photo: the fields photos.json
+uses and nothing else, in a slotted dataclass (no per-instance __dict__).
+Records are converted to plain dicts only when an index is written.
+
+Usage:
+python photo_record.py [photos.json]   # memory per photo: dict vs record
+"""
+
+import json
+import sys
+import tracemalloc
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional
+
+@dataclass(slots=True)
+class PhotoRecord:
+    id: int
+    title: str
+    category: str
+    thumbnail: str
+    full: str
+    lat: Optional[float]
+    lng: Optional[float]
+    location: str
+    date: str
+    filename: str
+    # Only some indexers fill these; left out of the index when unset
+    original_file: Optional[str] = None
+    google_drive_folder: Optional[str] = None
+    zoom: Optional[str] = None  # Deep Zoom descriptor (.dzi) for the lightbox
+    # Colour statistics from color_stats.py
+    palette: Optional[List[str]] = None
+    luminance: Optional[float] = None
+    sharpness: Optional[float] = None
+    related: Optional[List[int]] = None  # IDs from related_photos.py
+    
+    def __post_init__(self):
+        # Categories, places and dates repeat across photos: keep one copy of each
+        for name in SHARED_FIELDS:
+            value = getattr(self, name)
+            if isinstance(value, str):
+                setattr(self, name, sys.intern(value))
+    
+    def to_dict(self) -> Dict:
+        """photos.json entry, in field order"""
+        entry = {}
+        for name in FIELD_NAMES:
+            value = getattr(self, name)
+            if value is not None or name not in OPTIONAL_FIELDS:
+                entry[name] = value
+        return entry
+    
+    @classmethod
+    def from_dict(cls, entry: Dict) -> 'PhotoRecord':
+        """Record from a photos.json (or manifest) entry; unknown keys are dropped"""
+        return cls(**{name: entry.get(name) for name in FIELD_NAMES})
+
+FIELD_NAMES = tuple(field.name for field in fields(PhotoRecord))
+OPTIONAL_FIELDS = ('original_file', 'google_drive_folder', 'zoom', 'palette', 'luminance', 'sharpness',
+                   'related')
+SHARED_FIELDS = ('category', 'location', 'date', 'google_drive_folder')
+
+def to_json(obj):
+    """json.dump(default=...) hook writing records in index format"""
+    if isinstance(obj, PhotoRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def measure(build, count: int) -> float:
+    """Peak bytes allocated per item while building `count` items"""
+    tracemalloc.start()
+    items = [build(i) for i in range(count)]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return peak / count
+
+def main():
+    photos_file = sys.argv[1] if len(sys.argv) > 1 else 'photos.json'
+    with open(photos_file, 'r') as f:
+        photos: List[Dict] = json.load(f)
+    if not photos:
+        print(f"❌ No photos in {photos_file}")
+        return
+    
+    # Fresh copies of the values, as an indexer would create them per photo
+    count = max(10000, len(photos))
+    sample = [photos[i % len(photos)] for i in range(count)]
+    copy = lambda value: value[:1] + value[1:] if isinstance(value, str) else value
+    as_dict = measure(lambda i: {k: copy(v) for k, v in sample[i].items()}, count)
+    as_record = measure(lambda i: PhotoRecord(**{k: copy(sample[i].get(k)) for k in FIELD_NAMES}), count)
+    
+    print(f"🧮 Memory per photo over {count} entries from {photos_file}:")
+    print(f"   dict:         {as_dict:.0f} bytes")
+    print(f"   PhotoRecord:  {as_record:.0f} bytes ({as_dict / as_record:.1f}x smaller)")
+
+if __name__ == "__main__":
+    main()
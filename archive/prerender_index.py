@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+First Grid Page Prerender
+
+Writes the first page of the photo grid straight into index.html, so the
+browser starts downloading thumbnails while parsing the page instead of
+after fetching photos.json. Two marked blocks are rewritten:
+
+- <!-- prerender:preload -->  <link rel="preload"> for the top thumbnails
+- <!-- prerender:grid -->     grid tiles (with dimensions and a gray placeholder)
+                             plus the first page of photos.json inline as JSON
+
+The page hydrates the prerendered tiles once photos.json arrives, and renders
+from scratch if the index changed since the prerender.
+
+Usage:
+python prerender_index.py [photos.json] [index.html]
+python prerender_index.py --clean [index.html]   # remove the prerendered content
+"""
+
+import argparse
+import html
+import json
+import os
+import re
+import sys
+from typing import Dict, List
+
+PRERENDER_CONFIG = {
+    'page_size': 24,          # Must match photosPerPage in index.html
+    'preload_count': 6,       # Tiles above the fold on a desktop (two rows of three)
+    'tile_size': (400, 533),  # Thumbnail size, 3:4 like the grid tiles
+}
+
+# Blocks are matched with their indentation so regenerated content lines up
+BLOCK_PATTERN = r'(?P<indent>[ \t]*)<!-- prerender:{name}\b[^>]*-->\n.*?^(?P=indent)<!-- /prerender:{name} -->'
+
+EMPTY_GRID = '''<!-- Loading indicator -->
+<div id="loading" class="text-center py-8">
+    <div class="inline-block animate-spin rounded-full h-8 w-8 border-b-2 border-gray-900"></div>
+    <p class="mt-2 text-gray-600">Loading photos...</p>
+</div>
+
+<!-- Photo Grid -->
+<div id="photo-grid" class="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-8 hidden">
+    <!-- Photos will be loaded dynamically -->
+</div>'''
+
+def render_tile(photo: Dict, index: int) -> str:
+    """Markup matching createPhotoElement() in index.html, visible from the start"""
+    width, height = PRERENDER_CONFIG['tile_size']
+    eager = index < PRERENDER_CONFIG['preload_count']
+    loading = 'fetchpriority="high"' if eager else 'loading="lazy"'
+    title = html.escape(photo['title'])
+    return f'''<div class="photo-item transition-opacity duration-500" data-category="{html.escape(photo['category'])}" data-index="{index}">
+    <div class="aspect-[3/4] bg-gray-100 rounded-sm overflow-hidden cursor-pointer group">
+        <img src="{html.escape(photo['thumbnail'])}" alt="{title}" width="{width}" height="{height}"
+             class="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300"
+             {loading}>
+    </div>
+    <div class="mt-2 text-right">
+        <h3 class="text-sm font-medium text-gray-900">{title}</h3>
+        <p class="text-xs text-gray-600">{html.escape(str(photo['location']))} • {html.escape(str(photo['date']))}</p>
+    </div>
+</div>'''
+
+def render_grid(photos: List[Dict]) -> str:
+    """Hidden loading indicator, visible grid with the first page, and the page's photos inline"""
+    tiles = '\n'.join(render_tile(photo, i) for i, photo in enumerate(photos))
+    # "</" inside the JSON would end the script element early
+    inline = json.dumps(photos, separators=(',', ':'), ensure_ascii=False).replace('</', '<\\/')
+    return f'''<!-- Loading indicator -->
+<div id="loading" class="text-center py-8 hidden">
+    <div class="inline-block animate-spin rounded-full h-8 w-8 border-b-2 border-gray-900"></div>
+    <p class="mt-2 text-gray-600">Loading photos...</p>
+</div>
+
+<!-- Photo Grid (first page prerendered) -->
+<div id="photo-grid" class="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-8">
+{indent_block(tiles, '    ')}
+</div>
+<script type="application/json" id="prerendered-photos">{inline}</script>'''
+
+def render_preload(photos: List[Dict]) -> str:
+    """Preload hints for the thumbnails above the fold"""
+    return '\n'.join(
+        f'<link rel="preload" as="image" href="{html.escape(photo["thumbnail"])}" fetchpriority="high">'
+        for photo in photos[:PRERENDER_CONFIG['preload_count']]
+    )
+
+def indent_block(text: str, indent: str) -> str:
+    """Indent every non-empty line"""
+    return '\n'.join(indent + line if line else line for line in text.split('\n'))
+
+def replace_block(page: str, name: str, content: str) -> str:
+    """Replace the content between a pair of prerender markers"""
+    pattern = re.compile(BLOCK_PATTERN.format(name=name), re.DOTALL | re.MULTILINE)
+    match = pattern.search(page)
+    if not match:
+        raise ValueError(f"prerender:{name} markers not found")
+
+    indent = match.group('indent')
+    block = f"{indent}<!-- prerender:{name} (generated by archive/prerender_index.py) -->\n"
+    if content:
+        block += indent_block(content, indent) + '\n'
+    block += f"{indent}<!-- /prerender:{name} -->"
+    return page[:match.start()] + block + page[match.end():]
+
+def prerender(page: str, photos: List[Dict]) -> str:
+    """index.html with the first page of photos prerendered (none: restore the empty page)"""
+    first_page = [photo for photo in photos if photo.get('thumbnail') and photo.get('full')]
+    first_page = first_page[:PRERENDER_CONFIG['page_size']]
+
+    page = replace_block(page, 'preload', render_preload(first_page))
+    return replace_block(page, 'grid', render_grid(first_page) if first_page else EMPTY_GRID)
+
+def main():
+    parser = argparse.ArgumentParser(description="Prerender the first grid page into index.html")
+    parser.add_argument('files', nargs='*', help="[photos.json] [index.html], or [index.html] with --clean")
+    parser.add_argument('--clean', action='store_true', help="remove prerendered content")
+    args = parser.parse_args()
+
+    if args.clean:
+        photos_file, html_file = None, (args.files or ['index.html'])[0]
+    else:
+        photos_file = args.files[0] if args.files else 'photos.json'
+        html_file = args.files[1] if len(args.files) > 1 else 'index.html'
+
+    photos = []
+    if photos_file:
+        if not os.path.exists(photos_file):
+            print(f"❌ {photos_file} not found")
+            sys.exit(1)
+        with open(photos_file, 'r') as f:
+            photos = json.load(f)
+
+    with open(html_file, 'r') as f:
+        page = f.read()
+
+    try:
+        updated = prerender(page, photos)
+    except ValueError as e:
+        print(f"❌ {html_file}: {e}")
+        sys.exit(1)
+
+    if updated != page:
+        tmp_file = f"{html_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            f.write(updated)
+        os.replace(tmp_file, html_file)
+
+    count = min(len(photos), PRERENDER_CONFIG['page_size'])
+    print(f"🪄 {html_file}: {'prerendered ' + str(count) + ' tiles' if count else 'prerender cleared'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Related Photos
+
+For every photo in photos.json, the IDs of the photos most like it, so the
+lightbox can offer related work without computing anything in the browser.
+
+Each photo becomes a small feature vector:
+- colour      histogram of its palette (color_stats.py), dominant colours weighted most
+- tone        mean luminance
+- date        days since the epoch, in units of RELATED_CONFIG['date_scale_days']
+- location    position on the globe, in units of RELATED_CONFIG['location_scale_km']
+- category    one-hot
+Missing values take the catalog average, so they neither attract nor repel.
+
+Neighbours are exact Euclidean nearest neighbours, found a block of photos at
+a time with one matrix product per block: memory stays at block x catalog, and
+a few thousand photos take well under a second.
+
+Usage:
+python related_photos.py [photos.json]
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import date
+from typing import Dict, List
+
+try:
+    import numpy as np
+except ImportError:
+    print("Missing dependencies. Install with:")
+    print("pip install numpy")
+    exit(1)
+
+RELATED_CONFIG = {
+    'count': 6,                 # Related photos listed per photo
+    'levels': 4,                # Per channel in the colour histogram (4^3 = 64 bins)
+    'date_scale_days': 730,
+    'location_scale_km': 1000,
+    'block_size': 512,          # Photos compared against the catalog per matrix product
+    'weights': {'color': 1.0, 'tone': 0.5, 'date': 0.5, 'location': 1.0, 'category': 0.5},
+}
+
+EARTH_RADIUS_KM = 6371
+
+def fill_missing(values: np.ndarray, present: np.ndarray) -> np.ndarray:
+    """Rows not present get the mean of the present ones (zeros if none are)"""
+    if present.any():
+        values[~present] = values[present].mean(axis=0)
+    else:
+        values[:] = 0
+    return values
+
+def color_features(photos: List[Dict]) -> np.ndarray:
+    """Unit-length palette histograms; a palette's first (most common) colour counts most"""
+    levels = RELATED_CONFIG['levels']
+    histograms = np.zeros((len(photos), levels ** 3))
+    present = np.zeros(len(photos), dtype=bool)
+    for row, photo in enumerate(photos):
+        for rank, hex_color in enumerate(photo.get('palette') or []):
+            r, g, b = (int(hex_color[i:i + 2], 16) * levels // 256 for i in (1, 3, 5))
+            histograms[row, (r * levels + g) * levels + b] += 1 / (rank + 1)
+            present[row] = True
+    
+    norms = np.linalg.norm(histograms, axis=1, keepdims=True)
+    histograms = np.divide(histograms, norms, out=histograms, where=norms > 0)
+    return fill_missing(histograms, present)
+
+def tone_features(photos: List[Dict]) -> np.ndarray:
+    luminance = np.array([[photo.get('luminance') if photo.get('luminance') is not None else np.nan]
+                          for photo in photos])
+    return fill_missing(luminance, ~np.isnan(luminance[:, 0]))
+
+def date_features(photos: List[Dict]) -> np.ndarray:
+    days = np.full((len(photos), 1), np.nan)
+    for row, photo in enumerate(photos):
+        try:
+            days[row, 0] = date.fromisoformat(str(photo.get('date'))[:10]).toordinal()
+        except ValueError:
+            pass
+    return fill_missing(days / RELATED_CONFIG['date_scale_days'], ~np.isnan(days[:, 0]))
+
+def location_features(photos: List[Dict]) -> np.ndarray:
+    """Points on a sphere scaled so that straight-line distance is in location_scale_km units"""
+    lat = np.radians([photo['lat'] if photo.get('lat') is not None else np.nan for photo in photos])
+    lng = np.radians([photo['lng'] if photo.get('lng') is not None else np.nan for photo in photos])
+    points = np.stack([np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)], axis=1)
+    points *= EARTH_RADIUS_KM / RELATED_CONFIG['location_scale_km']
+    return fill_missing(points, ~np.isnan(lat) & ~np.isnan(lng))
+
+def category_features(photos: List[Dict]) -> np.ndarray:
+    categories = sorted({photo['category'] for photo in photos})
+    one_hot = np.zeros((len(photos), len(categories)))
+    one_hot[np.arange(len(photos)), [categories.index(photo['category']) for photo in photos]] = 1
+    return one_hot
+
+FEATURES = {
+    'color': color_features,
+    'tone': tone_features,
+    'date': date_features,
+    'location': location_features,
+    'category': category_features,
+}
+
+def feature_matrix(photos: List[Dict]) -> np.ndarray:
+    """One weighted feature row per photo, centred on the catalog average"""
+    weights = RELATED_CONFIG['weights']
+    features = np.hstack([weights[name] * build(photos) for name, build in FEATURES.items()])
+    # Dates are large numbers; without centring, |a|^2 + |b|^2 - 2ab loses the small differences
+    return features - features.mean(axis=0)
+
+def nearest_neighbours(features: np.ndarray, count: int) -> np.ndarray:
+    """Row indices of each row's `count` nearest other rows, nearest first"""
+    photos = len(features)
+    count = min(count, photos - 1)
+    neighbours = np.empty((photos, max(count, 0)), dtype=np.int64)
+    if count <= 0:
+        return neighbours
+    
+    squared = (features ** 2).sum(axis=1)
+    for start in range(0, photos, RELATED_CONFIG['block_size']):
+        block = features[start:start + RELATED_CONFIG['block_size']]
+        rows = np.arange(len(block))
+        # |a - b|^2 = |a|^2 + |b|^2 - 2ab for the whole block at once
+        distances = squared[start:start + len(block), None] + squared[None, :] - 2 * block @ features.T
+        distances[rows, start + rows] = np.inf
+        
+        # Candidates in catalog order, so equally close photos are listed in that order
+        closest = np.sort(np.argpartition(distances, count - 1, axis=1)[:, :count], axis=1)
+        order = np.argsort(np.take_along_axis(distances, closest, axis=1), axis=1, kind='stable')
+        neighbours[start:start + len(block)] = np.take_along_axis(closest, order, axis=1)
+    return neighbours
+
+def add_related(photos: List[Dict]):
+    """Set each photo's 'related' to the IDs of its nearest neighbours"""
+    if not photos:
+        return
+    neighbours = nearest_neighbours(feature_matrix(photos), RELATED_CONFIG['count'])
+    ids = [photo['id'] for photo in photos]
+    for photo, row in zip(photos, neighbours):
+        photo['related'] = [ids[i] for i in row]
+
+def main():
+    photos_file = sys.argv[1] if len(sys.argv) > 1 else 'photos.json'
+    if not os.path.exists(photos_file):
+        print(f"❌ {photos_file} not found")
+        sys.exit(1)
+    
+    with open(photos_file, 'r') as f:
+        photos = json.load(f)
+    
+    started = time.perf_counter()
+    add_related(photos)
+    elapsed = time.perf_counter() - started
+    
+    from index_deltas import publish_index
+    publish_index(photos, photos_file)
+    print(f"🔗 {photos_file}: {RELATED_CONFIG['count']} related photos each for {len(photos)} photos "
+          f"in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
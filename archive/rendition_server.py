@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+On-demand Rendition Server
+
+Serves web renditions of the local photo library straight from the source
+files, rendered by the same decode/resize/encode path the indexer uses, so a
+new quality setting or size can be previewed without rebuilding photos/.
+Only the images a browser actually requests are rendered.
+
+URLs:
+/<photo>/<width>.<format>[?q=<quality>]
+    photo   photo ID (as in photos.json, decimal or 13-digit hex) or the
+            filename stem of its full rendition
+    width   output width in pixels (never upscaled)
+    format  jpg or webp
+    q       encoder quality, default CONFIG['full_size_quality']
+
+Results are kept in a two-tier LRU: recent renditions in memory, the rest in
+a size-bounded disk cache that survives restarts. Cache keys include the
+source file's size and mtime, so editing a photo invalidates its renditions.
+Responses carry an ETag and Last-Modified for conditional requests, and
+concurrent requests for the same rendition wait for a single render.
+
+Photos are looked up in the manifest written by local_photos_indexer.py,
+which is re-read whenever it changes (e.g. while --watch runs).
+
+Requirements:
+pip install pillow exifread
+
+Usage:
+python rendition_server.py [--port 8001] [--cache-mb 512]
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import local_photos_indexer as indexer_module
+from local_photos_indexer import CONFIG, LocalPhotosIndexer
+
+SERVER_CONFIG = {
+    'host': '127.0.0.1',
+    'port': 8001,
+    'cache_dir': '.rendition_cache',
+    'cache_mb': 512,         # Disk tier
+    'memory_cache_mb': 64,   # Hot tier, kept in RAM
+    'max_width': 6000,
+}
+
+FORMATS = {
+    'jpg': 'image/jpeg',
+    'webp': 'image/webp',
+}
+
+class LRUDiskCache:
+    """Rendered files bounded by total size, least recently used evicted first"""
+    
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # File name -> size, oldest first
+        self.total = 0
+        self.lock = threading.Lock()
+        
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Resume from a previous run, least recently used by access time first
+        files = [path for path in self.directory.iterdir() if path.is_file() and not path.name.startswith('.')]
+        for path in sorted(files, key=lambda path: path.stat().st_atime):
+            size = path.stat().st_size
+            self.entries[path.name] = size
+            self.total += size
+        with self.lock:
+            self.evict()
+    
+    def get(self, name: str) -> Optional[bytes]:
+        """Cached bytes, marked as most recently used"""
+        with self.lock:
+            if name not in self.entries:
+                return None
+            self.entries.move_to_end(name)
+        try:
+            path = self.directory / name
+            data = path.read_bytes()
+            os.utime(path)  # Keeps LRU order across restarts
+            return data
+        except FileNotFoundError:
+            with self.lock:
+                self.total -= self.entries.pop(name, 0)
+            return None
+    
+    def put(self, name: str, data: bytes):
+        """Store bytes atomically and evict down to the size bound"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.directory / name)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        
+        with self.lock:
+            self.total += len(data) - self.entries.pop(name, 0)
+            self.entries[name] = len(data)
+            self.evict()
+    
+    def evict(self):
+        """Drop least recently used files until under the bound (lock held)"""
+        while self.total > self.max_bytes and self.entries:
+            name, size = self.entries.popitem(last=False)
+            self.total -= size
+            try:
+                (self.directory / name).unlink()
+            except FileNotFoundError:
+                pass
+
+class RenditionCache:
+    """In-memory hot tier in front of the disk cache, with one render per key at a time"""
+    
+    def __init__(self, disk: LRUDiskCache, memory_bytes: int):
+        self.disk = disk
+        self.memory_bytes = memory_bytes
+        self.memory = OrderedDict()  # Key -> bytes
+        self.memory_total = 0
+        self.in_flight: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'renders': 0, 'joined': 0}
+    
+    def get(self, key: str, render) -> bytes:
+        """Cached rendition for key, calling render() once if no tier has it"""
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return self.memory[key]
+            
+            # Someone is already producing this rendition: wait for their result
+            future = self.in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self.in_flight[key] = Future()
+            else:
+                self.stats['joined'] += 1
+        if not owner:
+            return future.result()
+        
+        try:
+            data = self.disk.get(key)
+            if data is not None:
+                with self.lock:
+                    self.stats['disk_hits'] += 1
+            else:
+                data = render()
+                self.disk.put(key, data)
+                with self.lock:
+                    self.stats['renders'] += 1
+            self.remember(key, data)
+            future.set_result(data)
+            return data
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+    
+    def remember(self, key: str, data: bytes):
+        """Add to the hot tier, evicting least recently used entries"""
+        if len(data) > self.memory_bytes:
+            return
+        with self.lock:
+            self.memory_total += len(data) - len(self.memory.pop(key, b''))
+            self.memory[key] = data
+            while self.memory_total > self.memory_bytes:
+                _, evicted = self.memory.popitem(last=False)
+                self.memory_total -= len(evicted)
+
+class PhotoLookup:
+    """Photo ID / rendition name -> source file, from the indexer's manifest"""
+    
+    def __init__(self, indexer: LocalPhotosIndexer):
+        self.indexer = indexer
+        self.manifest_path = Path(CONFIG['manifest_file'])
+        self.manifest_mtime = None
+        self.sources: Dict[str, Path] = {}
+        self.lock = threading.Lock()
+    
+    def find(self, name: str) -> Optional[Path]:
+        """Source file for a photo ID or rendition filename stem"""
+        with self.lock:
+            self.refresh()
+            return self.sources.get(name.lower())
+    
+    def refresh(self):
+        """Re-read the manifest when it changed on disk (lock held)"""
+        try:
+            mtime = self.manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self.sources = {}
+            return
+        if mtime == self.manifest_mtime:
+            return
+        
+        sources = {}
+        for rel, entry in LocalPhotosIndexer.read_manifest(self.manifest_path).items():
+            photo = entry['photo']
+            source = self.indexer.source_path / rel
+            sources[str(photo.id)] = source
+            sources[f"{photo.id:013x}"] = source
+            sources[Path(photo.filename).stem.lower()] = source
+        self.sources = sources
+        self.manifest_mtime = mtime
+        print(f"📋 Loaded {len(sources) // 3} photos from {self.manifest_path}")
+
+def encode_webp(img, quality: int) -> bytes:
+    """WebP without metadata"""
+    buffer = io.BytesIO()
+    img.save(buffer, 'WEBP', quality=quality, method=4)
+    return buffer.getvalue()
+
+def parse_path(path: str) -> Optional[Tuple[str, int, str]]:
+    """(photo, width, format) from /<photo>/<width>.<format>, or None"""
+    parts = path.strip('/').split('/')
+    if len(parts) != 2:
+        return None
+    width, _, fmt = parts[1].partition('.')
+    if not width.isdigit() or fmt not in FORMATS:
+        return None
+    width = int(width)
+    if not 1 <= width <= SERVER_CONFIG['max_width']:
+        return None
+    return parts[0], width, fmt
+
+class RenditionServer:
+    def __init__(self):
+        self.indexer = LocalPhotosIndexer()
+        self.indexer.prepare_imaging()
+        self.lookup = PhotoLookup(self.indexer)
+        disk = LRUDiskCache(Path(SERVER_CONFIG['cache_dir']), SERVER_CONFIG['cache_mb'] * 1024 * 1024)
+        self.cache = RenditionCache(disk, SERVER_CONFIG['memory_cache_mb'] * 1024 * 1024)
+        
+        # Everything that changes the rendered pixels besides the request itself
+        settings = [CONFIG['color_manage'], CONFIG['adaptive_quality'], CONFIG['target_ssim'],
+                    CONFIG['adaptive_min_quality'], CONFIG['use_embedded_previews']]
+        self.settings_digest = hashlib.sha1(json.dumps(settings).encode()).hexdigest()[:8]
+    
+    def rendition_key(self, source: Path, width: int, fmt: str, quality: int) -> Tuple[str, float]:
+        """Cache key (also the ETag) and source mtime for a request"""
+        stat = source.stat()
+        identity = f"{source}:{stat.st_size}:{stat.st_mtime_ns}:{width}:{quality}:{self.settings_digest}"
+        return f"{hashlib.sha1(identity.encode()).hexdigest()}.{fmt}", stat.st_mtime
+    
+    def render(self, source: Path, width: int, fmt: str, quality: int) -> bytes:
+        """One rendition, decoded and resized like the indexer's"""
+        started = time.perf_counter()
+        # Width-bound only: the height follows the aspect ratio
+        for _, img in self.indexer.iter_renditions(source, [(width, 1 << 30)]):
+            data = self.indexer.encode_rendition(img, quality) if fmt == 'jpg' else encode_webp(img, quality)
+        print(f"🖼️  Rendered {source.name} at {width}px {fmt} q{quality} "
+              f"({len(data) // 1024} KB, {(time.perf_counter() - started) * 1000:.0f} ms)")
+        return data
+    
+    def handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                self.respond(send_body=False)
+            
+            def do_GET(self):
+                self.respond(send_body=True)
+            
+            def respond(self, send_body: bool):
+                url = urlsplit(self.path)
+                request = parse_path(url.path)
+                if request is None:
+                    self.send_error(404, "Expected /<photo>/<width>.<jpg|webp>")
+                    return
+                name, width, fmt = request
+                
+                try:
+                    quality = int(parse_qs(url.query).get('q', [CONFIG['full_size_quality']])[0])
+                except ValueError:
+                    quality = 0
+                if not 1 <= quality <= 100:
+                    self.send_error(400, "q must be between 1 and 100")
+                    return
+                
+                source = server.lookup.find(name)
+                if source is None or not source.exists():
+                    self.send_error(404, f"Unknown photo {name}")
+                    return
+                
+                key, mtime = server.rendition_key(source, width, fmt, quality)
+                etag = f'"{key.split(".")[0]}"'
+                if self.not_modified(etag, mtime):
+                    self.send_response(304)
+                    self.send_validators(etag, mtime)
+                    self.end_headers()
+                    return
+                
+                try:
+                    data = server.cache.get(key, lambda: server.render(source, width, fmt, quality))
+                except Exception as e:
+                    print(f"❌ Rendering {source.name} failed: {e}")
+                    self.send_error(500, f"Rendering failed: {e}")
+                    return
+                
+                self.send_response(200)
+                self.send_header('Content-Type', FORMATS[fmt])
+                self.send_header('Content-Length', str(len(data)))
+                self.send_validators(etag, mtime)
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(data)
+            
+            def not_modified(self, etag: str, mtime: float) -> bool:
+                """Conditional request check; If-None-Match wins over If-Modified-Since"""
+                if_none_match = self.headers.get('If-None-Match')
+                if if_none_match is not None:
+                    tags = [tag.strip() for tag in if_none_match.split(',')]
+                    return '*' in tags or etag in tags or f"W/{etag}" in tags
+                
+                if_modified_since = self.headers.get('If-Modified-Since')
+                if if_modified_since:
+                    try:
+                        return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+                    except (TypeError, ValueError):
+                        return False
+                return False
+            
+            def send_validators(self, etag: str, mtime: float):
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', formatdate(mtime, usegmt=True))
+                # Revalidate every time: the source may be edited while previewing
+                self.send_header('Cache-Control', 'no-cache')
+        
+        return Handler
+    
+    def serve(self):
+        httpd = ThreadingHTTPServer((SERVER_CONFIG['host'], SERVER_CONFIG['port']), self.handler())
+        print(f"🌐 Serving renditions on http://{SERVER_CONFIG['host']}:{SERVER_CONFIG['port']}/<photo>/<width>.jpg")
+        print(f"   Cache: {SERVER_CONFIG['cache_dir']} ({SERVER_CONFIG['cache_mb']} MB on disk, "
+              f"{SERVER_CONFIG['memory_cache_mb']} MB in memory)")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            stats = self.cache.stats
+            print(f"\n👋 Stopping: {stats['renders']} rendered, {stats['memory_hits']} memory hits, "
+                  f"{stats['disk_hits']} disk hits, {stats['joined']} joined an in-flight render")
+        finally:
+            httpd.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve photo renditions on demand from the source files")
+    parser.add_argument('--host', default=SERVER_CONFIG['host'])
+    parser.add_argument('--port', type=int, default=SERVER_CONFIG['port'])
+    parser.add_argument('--cache-mb', type=int, default=SERVER_CONFIG['cache_mb'], help="disk cache size bound")
+    parser.add_argument('--adaptive-quality', action='store_true',
+                        help="encode JPEGs at the lowest quality meeting CONFIG['target_ssim'], as the indexer does")
+    args = parser.parse_args()
+    
+    SERVER_CONFIG.update(host=args.host, port=args.port, cache_mb=args.cache_mb)
+    if args.adaptive_quality:
+        indexer_module.load_imaging()
+        if indexer_module.np is None:
+            print("Missing dependencies. Install with:")
+            print("pip install numpy")
+            return
+        CONFIG['adaptive_quality'] = True
+    
+    RenditionServer().serve()
+
+if __name__ == "__main__":
+    main()
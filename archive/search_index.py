@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Search Index Builder
+
+Builds a compact inverted index over photo titles, locations, categories and
+dates, written next to photos.json so the website can answer prefix and
+faceted searches without scanning every photo record on each keystroke.
+
+Format (search_index.json):
+{
+  "version": 1,
+  "tokens": ["aug", "august", "okinawa", ...],       # sorted, for prefix lookup
+  "postings": [[3, 1, 4], ...],                       # photo IDs per token
+  "facets": {
+    "year": {"2025": [1, 1]},
+    "month": {"2025-08": [1, 1]},
+    "category": {"street": [1, 2]},
+    "location": {"Okinawa": [2]}
+  }
+}
+Posting lists are sorted and delta-encoded: the first number is an ID, every
+following number is the gap to the previous ID.
+
+Usage:
+python search_index.py [photos.json] [search_index.json]
+"""
+
+import json
+import os
+import re
+import sys
+import unicodedata
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+INDEX_VERSION = 1
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, accent-folded word tokens"""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return [token for token in re.split(r'[^0-9a-z]+', text) if token]
+
+def delta_encode(ids: Iterable[int]) -> List[int]:
+    """Sorted, de-duplicated IDs as first value followed by gaps"""
+    encoded = []
+    previous = 0
+    for photo_id in sorted(set(ids)):
+        encoded.append(photo_id - previous)
+        previous = photo_id
+    return encoded
+
+def photo_terms(photo: Dict) -> set:
+    """Searchable tokens for one photo"""
+    terms = set(tokenize(photo.get('title', '')))
+    terms.update(tokenize(photo.get('category', '')))
+    
+    location = photo.get('location')
+    if location and location != 'Unknown':
+        terms.update(tokenize(location))
+    
+    # Dates are searchable as year and month name ("2025", "august", "aug")
+    try:
+        date = datetime.strptime(photo.get('date', ''), '%Y-%m-%d')
+        terms.update((str(date.year), date.strftime('%B').lower(), date.strftime('%b').lower()))
+    except ValueError:
+        pass
+    return terms
+
+def build_search_index(photos: List[Dict]) -> Dict:
+    """Build the inverted index and facets for a list of photo entries"""
+    postings = defaultdict(list)
+    facets = {'year': defaultdict(list), 'month': defaultdict(list),
+              'category': defaultdict(list), 'location': defaultdict(list)}
+    
+    for photo in photos:
+        photo_id = photo['id']
+        for term in photo_terms(photo):
+            postings[term].append(photo_id)
+        
+        date = photo.get('date') or ''
+        if re.match(r'\d{4}-\d{2}-\d{2}$', date):
+            facets['year'][date[:4]].append(photo_id)
+            facets['month'][date[:7]].append(photo_id)
+        if photo.get('category'):
+            facets['category'][photo['category']].append(photo_id)
+        if photo.get('location') and photo['location'] != 'Unknown':
+            facets['location'][photo['location']].append(photo_id)
+    
+    tokens = sorted(postings)
+    return {
+        'version': INDEX_VERSION,
+        'tokens': tokens,
+        'postings': [delta_encode(postings[token]) for token in tokens],
+        'facets': {
+            name: {value: delta_encode(ids) for value, ids in sorted(values.items())}
+            for name, values in facets.items()
+        }
+    }
+
+def write_search_index(photos: List[Dict], output_file: str) -> Dict:
+    """Atomically write the search index as compact JSON"""
+    index = build_search_index(photos)
+    tmp_file = f"{output_file}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+    os.replace(tmp_file, output_file)
+    return index
+
+def main():
+    photos_file = sys.argv[1] if len(sys.argv) > 1 else 'photos.json'
+    output_file = sys.argv[2] if len(sys.argv) > 2 else 'search_index.json'
+    
+    with open(photos_file, 'r') as f:
+        photos = json.load(f)
+    
+    index = write_search_index(photos, output_file)
+    print(f"🔎 Wrote {output_file}: {len(index['tokens'])} tokens over {len(photos)} photos")
+
+if __name__ == "__main__":
+    main()
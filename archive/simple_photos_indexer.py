@@ -16,22 +16,23 @@ Requirements:
 pip install pillow exifread
 """
 
-import json
+import importlib.util
 import os
 import shutil
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
-try:
-    from PIL import Image
-    from PIL.ExifTags import TAGS, GPSTAGS
-    import exifread
-except ImportError:
+# Pillow and exifread are imported when a photo is first read, not at startup
+if not all(importlib.util.find_spec(name) for name in ('PIL', 'exifread')):
     print("Missing dependencies. Install with:")
     print("pip install pillow exifread")
     exit(1)
 
+from photo_metadata_store import PhotoMetadataStore
+from photo_record import PhotoRecord
+from index_deltas import content_id, publish_index
+
 # Configuration
 CONFIG = {
     # Local photos directory (in your Nextcloud folder)
@@ -46,6 +47,7 @@ CONFIG = {
     
     # Output settings
     'output_file': 'photos.json',
+    'metadata_store': 'photo_metadata.sqlite',  # Shared EXIF/dimension/hash cache
     'web_photos_dir': 'portfolio',  # Changed from 'photos' to avoid conflict with 'Photos'
     'max_photos_per_category': 500,
     'supported_formats': ['.jpg', '.jpeg', '.png', '.webp', '.heic'],
@@ -58,38 +60,17 @@ CONFIG = {
 class SimplePhotosIndexer:
     def __init__(self):
         self.photos = []
+        self.metadata_store = PhotoMetadataStore(CONFIG['metadata_store'])
         self.source_path = Path(CONFIG['photos_source_dir'])
         
         # Create output directory for web-optimized photos (no thumbnails folder)
         self.web_photos_dir = Path(CONFIG['web_photos_dir'])
         self.web_photos_dir.mkdir(parents=True, exist_ok=True)
     
-    def extract_gps_from_exif(self, exif_data) -> Optional[Tuple[float, float]]:
-        """Extract GPS coordinates from EXIF data"""
-        try:
-            if 'GPS GPSLatitude' in exif_data and 'GPS GPSLongitude' in exif_data:
-                lat_ref = str(exif_data.get('GPS GPSLatitudeRef', 'N'))
-                lat_vals = exif_data['GPS GPSLatitude'].values
-                
-                lng_ref = str(exif_data.get('GPS GPSLongitudeRef', 'E'))
-                lng_vals = exif_data['GPS GPSLongitude'].values
-                
-                # Convert to decimal degrees
-                lat = float(lat_vals[0]) + float(lat_vals[1])/60 + float(lat_vals[2])/3600
-                lng = float(lng_vals[0]) + float(lng_vals[1])/60 + float(lng_vals[2])/3600
-                
-                if lat_ref == 'S':
-                    lat = -lat
-                if lng_ref == 'W':
-                    lng = -lng
-                    
-                return lat, lng
-        except Exception as e:
-            print(f"GPS extraction error: {e}")
-        return None
-    
     def optimize_image(self, input_path: Path, output_path: Path) -> bool:
         """Optimize image for web (single size, no thumbnails)"""
+        from PIL import Image
+        
         try:
             with Image.open(input_path) as img:
                 # Handle HEIC files
@@ -133,43 +114,22 @@ class SimplePhotosIndexer:
             print(f"Image optimization error for {input_path}: {e}")
             return False
     
-    def process_photo(self, file_path: Path, category: str) -> Optional[Dict]:
+    def process_photo(self, file_path: Path, category: str) -> Optional[PhotoRecord]:
         """Process a single photo"""
         try:
-            # Extract EXIF data
-            exif_data = {}
-            date_taken = None
-            gps_coords = None
-            
-            with open(file_path, 'rb') as f:
-                tags = exifread.process_file(f)
-                exif_data = {str(k): str(v) for k, v in tags.items()}
-                
-                # Extract date
-                if 'EXIF DateTimeOriginal' in tags:
-                    date_str = str(tags['EXIF DateTimeOriginal'])
-                    try:
-                        date_taken = datetime.strptime(date_str, '%Y:%m:%d %H:%M:%S').strftime('%Y-%m-%d')
-                    except:
-                        pass
-                elif 'DateTime' in tags:
-                    date_str = str(tags['DateTime'])
-                    try:
-                        date_taken = datetime.strptime(date_str, '%Y:%m:%d %H:%M:%S').strftime('%Y-%m-%d')
-                    except:
-                        pass
-                
-                # Extract GPS
-                gps_coords = self.extract_gps_from_exif(tags)
+            # Metadata comes from the shared store; the file is only read when it changed
+            metadata = self.metadata_store.get_local(file_path)
+            date_taken = metadata['date']
+            gps_coords = (metadata['lat'], metadata['lng']) if metadata['lat'] is not None else None
             
-            # Generate web-friendly filename
-            photo_id = len(self.photos) + 1
+            # Generate web-friendly filename; the ID comes from the file's content
+            photo_id = content_id(metadata['sha1'])
             original_name = file_path.stem
             safe_name = "".join(c for c in original_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
             safe_name = safe_name.replace(' ', '_').lower()
             
             # Single optimized file (no separate thumbnail)
-            filename = f"{category}_{photo_id:03d}_{safe_name}.jpg"
+            filename = f"{category}_{photo_id:013x}_{safe_name}.jpg"
             
             # Create optimized image
             output_path = self.web_photos_dir / filename
@@ -193,25 +153,25 @@ class SimplePhotosIndexer:
                 if parent_dir and parent_dir.lower() != category.lower():
                     location = parent_dir.replace('_', ' ').replace('-', ' ')
             
-            return {
-                'id': photo_id,
-                'title': original_name.replace('_', ' ').replace('-', ' ').title(),
-                'category': category,
-                'thumbnail': image_url,  # Same as full
-                'full': image_url,       # Same as thumbnail
-                'lat': gps_coords[0] if gps_coords else None,
-                'lng': gps_coords[1] if gps_coords else None,
-                'location': location,
-                'date': date_taken or datetime.fromtimestamp(file_path.stat().st_mtime).strftime('%Y-%m-%d'),
-                'filename': filename,
-                'original_file': file_path.name
-            }
-            
+            return PhotoRecord(
+                id=photo_id,
+                title=original_name.replace('_', ' ').replace('-', ' ').title(),
+                category=category,
+                thumbnail=image_url,  # Same as full
+                full=image_url,       # Same as thumbnail
+                lat=gps_coords[0] if gps_coords else None,
+                lng=gps_coords[1] if gps_coords else None,
+                location=location,
+                date=date_taken or datetime.fromtimestamp(file_path.stat().st_mtime).strftime('%Y-%m-%d'),
+                filename=filename,
+                original_file=file_path.name
+            )
+        
         except Exception as e:
             print(f"Error processing {file_path}: {e}")
             return None
     
-    def scan_directory(self, directory: str, category: str) -> List[Dict]:
+    def scan_directory(self, directory: str, category: str) -> List[PhotoRecord]:
         """Scan directory and process photos"""
         photos = []
         dir_path = self.source_path / directory
@@ -275,14 +235,10 @@ class SimplePhotosIndexer:
             self.photos.extend(category_photos)
             print(f"✅ Processed {len(category_photos)} {category} photos")
         
-        # Sort by date (newest first)
-        self.photos.sort(key=lambda x: x['date'], reverse=True)
-        
         print(f"📊 Total photos processed: {len(self.photos)}")
         
-        # Save to JSON
-        with open(CONFIG['output_file'], 'w') as f:
-            json.dump(self.photos, f, indent=2)
+        # Save to JSON (sorted by date, newest first), versioned with a delta for returning visitors
+        publish_index([photo.to_dict() for photo in self.photos], CONFIG['output_file'])
         
         print(f"💾 Saved index to {CONFIG['output_file']}")
         
@@ -290,9 +246,9 @@ class SimplePhotosIndexer:
         categories = {}
         locations = set()
         for photo in self.photos:
-            categories[photo['category']] = categories.get(photo['category'], 0) + 1
-            if photo['location'] != 'Unknown':
-                locations.add(photo['location'])
+            categories[photo.category] = categories.get(photo.category, 0) + 1
+            if photo.location != 'Unknown':
+                locations.add(photo.location)
         
         print("\n📈 Summary:")
         for cat, count in categories.items():
@@ -10,6 +10,12 @@ REPO_NAME="jodiejacobs-photography"
 RELEASE_TAG="v1.0.0"
 PORTFOLIO_DIR="photos"
 PHOTOS_JSON="photos.json"
+SEARCH_INDEX_JSON="search_index.json"
+PHOTOS_VERSION_JSON="photos_version.json"  # Written with deltas/ by archive/index_deltas.py
+PHOTOS_GEO_JSON="photos_geo.json"          # Map markers, also written by archive/index_deltas.py
+THUMBNAILS_DIR="thumbnails"
+THUMBNAIL_SIZE="400x533"  # Grid tile size (3:4), thumbnails cover it
+THUMBNAIL_QUALITY=82
 BASE_URL="https://github.com/$GITHUB_USER/$REPO_NAME/releases/download/$RELEASE_TAG"
 
 # Colors for output
@@ -66,9 +72,76 @@ check_dependencies() {
         fi
     fi
     
+    # Check for an image tool to render thumbnails
+    if ! command -v magick &> /dev/null && ! command -v convert &> /dev/null && ! command -v sips &> /dev/null; then
+        log_error "No image tool found for thumbnails. Please install ImageMagick:"
+        echo "  Mac: brew install imagemagick"
+        echo "  Linux: sudo apt install imagemagick"
+        exit 1
+    fi
+    
     log_success "Dependencies OK"
 }
 
+# Release asset name (GitHub replaces spaces with dots)
+asset_name() {
+    basename "$1" | sed 's/ /./g'
+}
+
+# Thumbnail path for an original
+thumbnail_path() {
+    local basename=$(basename "$1" | sed 's/\.[^.]*$//')  # Remove extension
+    echo "$THUMBNAILS_DIR/${basename}_thumb.jpg"
+}
+
+# Render one thumbnail, covering the grid tile without upscaling
+render_thumbnail() {
+    local img="$1"
+    local thumb="$2"
+    
+    if command -v magick &> /dev/null; then
+        magick "$img" -auto-orient -thumbnail "${THUMBNAIL_SIZE}^>" -strip -interlace JPEG -quality "$THUMBNAIL_QUALITY" "$thumb"
+    elif command -v convert &> /dev/null; then
+        convert "$img" -auto-orient -thumbnail "${THUMBNAIL_SIZE}^>" -strip -interlace JPEG -quality "$THUMBNAIL_QUALITY" "$thumb"
+    else
+        sips -Z 800 -s format jpeg -s formatOptions "$THUMBNAIL_QUALITY" "$img" --out "$thumb" > /dev/null
+    fi
+}
+
+# Generate thumbnails for new or changed originals
+# Sets CHANGED_THUMBNAILS to the thumbnails that were (re)generated
+generate_thumbnails() {
+    CHANGED_THUMBNAILS=()
+    local unchanged=0
+    
+    mkdir -p "$THUMBNAILS_DIR"
+    
+    for img in "$@"; do
+        local thumb=$(thumbnail_path "$img")
+        
+        # Skip thumbnails that are newer than their original
+        if [[ -f "$thumb" && "$thumb" -nt "$img" ]]; then
+            ((unchanged++)) || true
+            continue
+        fi
+        
+        render_thumbnail "$img" "$thumb"
+        CHANGED_THUMBNAILS+=("$thumb")
+    done
+    
+    log_success "Thumbnails: ${#CHANGED_THUMBNAILS[@]} generated, $unchanged unchanged"
+}
+
+# Upload thumbnails that were (re)generated
+upload_thumbnails() {
+    if [[ ${#CHANGED_THUMBNAILS[@]} -eq 0 ]]; then
+        return 0
+    fi
+    
+    log_info "Uploading ${#CHANGED_THUMBNAILS[@]} thumbnails..."
+    gh release upload "$RELEASE_TAG" --clobber "${CHANGED_THUMBNAILS[@]}"
+}
+
 # Extract photo info from filename
 extract_photo_info() {
     local filename="$1"
@@ -95,6 +168,12 @@ extract_photo_info() {
     echo "$category|$title"
 }
 
+# Stable photo ID from file content: first 52 bits of its SHA-1 (exact as a JS number)
+content_id() {
+    local hash=$(shasum -a 1 "$1" | cut -c1-13)
+    echo $((16#$hash))
+}
+
 # Scan portfolio directory and generate photo data
 scan_portfolio() {
     log_info "Scanning portfolio directory..."
@@ -104,9 +183,12 @@ scan_portfolio() {
         exit 1
     fi
     
-    local photo_id=1
     local photos_array="[]"
     
+    # Keep the previous index: unchanged photos keep their dates, and it is the delta base
+    local previous_json=$(mktemp)
+    [[ -f "$PHOTOS_JSON" ]] && cp "$PHOTOS_JSON" "$previous_json"
+    
     # Find all image files
     shopt -s nullglob  # Handle case where no files match
     for img in "$PORTFOLIO_DIR"/*.jpg "$PORTFOLIO_DIR"/*.jpeg "$PORTFOLIO_DIR"/*.png "$PORTFOLIO_DIR"/*.JPG "$PORTFOLIO_DIR"/*.JPEG "$PORTFOLIO_DIR"/*.PNG "$PORTFOLIO_DIR"/*/*.jpg "$PORTFOLIO_DIR"/*/*.jpeg "$PORTFOLIO_DIR"/*/*.png "$PORTFOLIO_DIR"/*/*.JPG "$PORTFOLIO_DIR"/*/*.JPEG "$PORTFOLIO_DIR"/*/*.PNG; do
@@ -117,15 +199,18 @@ scan_portfolio() {
         local info=$(extract_photo_info "$filename")
         local category=$(echo "$info" | cut -d'|' -f1)
         local title=$(echo "$info" | cut -d'|' -f2)
-        local date=$(date +%Y-%m-%d)
+        local photo_id=$(content_id "$img")
+        local date=$(jq -r --arg filename "$filename" \
+            'map(select(.original_file == $filename))[0].date // empty' "$previous_json" 2>/dev/null)
+        [[ -z "$date" ]] && date=$(date +%Y-%m-%d)
         
         # Create photo object
         local photo_obj=$(jq -n \
             --argjson id "$photo_id" \
             --arg title "$title" \
             --arg category "$category" \
-            --arg thumbnail "$BASE_URL/$(basename "$filename" | sed 's/ /./g')" \
-            --arg full "$BASE_URL/$(basename "$filename" | sed 's/ /./g')" \
+            --arg thumbnail "$BASE_URL/$(asset_name "$(thumbnail_path "$filename")")" \
+            --arg full "$BASE_URL/$(asset_name "$filename")" \
             --arg location "Unknown" \
             --arg date "$date" \
             --arg filename "$(basename "$filename" | sed 's/ /./g')" \
@@ -148,7 +233,6 @@ scan_portfolio() {
         photos_array=$(echo "$photos_array" | jq ". += [$photo_obj]")
         
         log_success "Found: $filename → $category → $title"
-        ((photo_id++))
     done
     
     # Write photos.json
@@ -156,6 +240,32 @@ scan_portfolio() {
     
     local photo_count=$(echo "$photos_array" | jq length)
     log_success "Generated $PHOTOS_JSON with $photo_count photos"
+    
+    publish_index_version "$previous_json"
+    rm -f "$previous_json"
+    build_search_index
+}
+
+# Version photos.json and write a delta from the previous index for returning visitors
+publish_index_version() {
+    local previous_json="$1"
+    
+    if ! command -v python3 &> /dev/null; then
+        log_warning "python3 not found, skipping $PHOTOS_VERSION_JSON"
+        return 0
+    fi
+    
+    python3 "$(dirname "$0")/archive/index_deltas.py" "$PHOTOS_JSON" --previous "$previous_json"
+}
+
+# Build the site search index from photos.json
+build_search_index() {
+    if ! command -v python3 &> /dev/null; then
+        log_warning "python3 not found, skipping $SEARCH_INDEX_JSON"
+        return 0
+    fi
+    
+    python3 "$(dirname "$0")/archive/search_index.py" "$PHOTOS_JSON" "$SEARCH_INDEX_JSON"
 }
 
 # Create or update GitHub release
@@ -164,15 +274,11 @@ manage_release() {
     
     log_info "Managing GitHub release..."
     
-    # Check if release exists
-    if gh release view "$RELEASE_TAG" &> /dev/null; then
-        if [[ "$force_recreate" == "true" ]]; then
-            log_warning "Deleting existing release $RELEASE_TAG"
-            gh release delete "$RELEASE_TAG" --yes
-        else
-            log_info "Release $RELEASE_TAG already exists"
-            return 0
-        fi
+    # Recreate from scratch if requested
+    if [[ "$force_recreate" == "true" ]] && gh release view "$RELEASE_TAG" &> /dev/null; then
+        log_warning "Deleting existing release $RELEASE_TAG"
+        gh release delete "$RELEASE_TAG" --yes
+        rm -rf "$THUMBNAILS_DIR"
     fi
     
     # Find all image files
@@ -187,13 +293,23 @@ manage_release() {
         exit 1
     fi
     
+    generate_thumbnails "${image_files[@]}"
+    
+    # Existing release: only push thumbnails that changed
+    if gh release view "$RELEASE_TAG" &> /dev/null; then
+        log_info "Release $RELEASE_TAG already exists"
+        upload_thumbnails
+        return 0
+    fi
+    
     log_info "Creating release $RELEASE_TAG with ${#image_files[@]} images..."
     
-    # Create release with all images
+    # Create release with all images and their thumbnails
     gh release create "$RELEASE_TAG" \
         --title "Portfolio Images" \
         --notes "Photography portfolio images for $GITHUB_USER.com" \
-        "${image_files[@]}"
+        "${image_files[@]}" \
+        "$THUMBNAILS_DIR"/*_thumb.jpg
     
     log_success "Release created successfully!"
     log_info "View at: https://github.com/$GITHUB_USER/$REPO_NAME/releases/tag/$RELEASE_TAG"
@@ -213,6 +329,10 @@ add_photo() {
     # Upload to release
     gh release upload "$RELEASE_TAG" "$image_path"
     
+    # Render and upload its thumbnail
+    generate_thumbnails "$image_path"
+    upload_thumbnails
+    
     log_success "Added $(basename "$image_path") to release"
     
     # Regenerate photos.json
@@ -231,20 +351,49 @@ update_photo() {
     fi
     
     # Update the specific field
+    local previous_json=$(mktemp)
+    cp "$PHOTOS_JSON" "$previous_json"
     local updated_json=$(jq --arg filename "$filename" --arg field "$field" --arg value "$value" \
         'map(if .filename == $filename then .[$field] = $value else . end)' "$PHOTOS_JSON")
     
     echo "$updated_json" > "$PHOTOS_JSON"
+    publish_index_version "$previous_json"
+    rm -f "$previous_json"
+    build_search_index
     
     log_success "Updated $field for $filename: $value"
 }
 
+# Pack each grid page's thumbnails into one sprite atlas (optional)
+build_sprites() {
+    python3 "$(dirname "$0")/archive/build_sprites.py" "$PHOTOS_JSON" --thumbnails-dir "$THUMBNAILS_DIR"
+    log_success "Sprite atlases written to sprites/"
+}
+
+# Write the first grid page into index.html so thumbnails start loading with the page
+prerender_index() {
+    if ! command -v python3 &> /dev/null; then
+        log_warning "python3 not found, skipping prerender"
+        return 0
+    fi
+    
+    python3 "$(dirname "$0")/archive/prerender_index.py" "$PHOTOS_JSON" index.html
+}
+
 # Deploy changes to GitHub
 deploy() {
     log_info "Deploying changes to GitHub..."
     
-    # Add photos.json
+    prerender_index
+    git add index.html
+    
+    # Add photos.json and its search index
     git add "$PHOTOS_JSON"
+    [[ -f "$SEARCH_INDEX_JSON" ]] && git add "$SEARCH_INDEX_JSON"
+    [[ -f "$PHOTOS_VERSION_JSON" ]] && git add "$PHOTOS_VERSION_JSON"
+    [[ -f "$PHOTOS_GEO_JSON" ]] && git add "$PHOTOS_GEO_JSON"
+    [[ -d deltas ]] && git add -A deltas
+    [[ -d sprites ]] && git add -A sprites
     
     # Commit if there are changes
     if git diff --cached --quiet; then
@@ -307,6 +456,7 @@ show_help() {
     echo "  setup [--force]           Initial setup - create release and photos.json"
     echo "  add <image_path>          Add new photo to release"
     echo "  update <filename> <field> <value>  Update photo metadata"
+    echo "  sprites                   Build per-page thumbnail atlases (optional)"
     echo "  deploy                    Deploy changes to GitHub"
     echo "  status                    Show current status"
     echo "  help                      Show this help"
@@ -353,6 +503,10 @@ main() {
             update_photo "$2" "$3" "$4"
             log_success "Photo updated! Run '$0 deploy' to push changes."
             ;;
+        "sprites")
+            build_sprites
+            log_success "Sprites built! Run '$0 deploy' to push changes."
+            ;;
         "deploy")
             check_dependencies
             deploy